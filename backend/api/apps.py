@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # pdf регистрирует фоновую задачу отрисовки списка покупок.
+        from . import pdf, signals  # noqa: F401
@@ -0,0 +1,66 @@
+"""Асинхронные точки входа для чтения рецептов, тегов и ингредиентов.
+
+Подключаются вместо маршрутов вьюсетов при ASYNC_API=True. Запрос
+обрабатывает тот же вьюсет DRF, что и в режиме WSGI, поэтому действуют
+троттлинг, ограничение тяжёлых запросов, пагинация с оценкой количества,
+кэш рецептов и потоковый список ингредиентов. Вьюсет выполняется в потоке
+запроса через sync_to_async, а потоковое тело ответа читается оттуда же по
+частям, не блокируя событийный цикл и не собирая ответ в памяти целиком.
+"""
+from asgiref.sync import sync_to_async
+
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+
+async def iterate_in_thread(content):
+    """Отдаёт части синхронного потокового тела, читая их в потоке."""
+    iterator = iter(content)
+    next_part = sync_to_async(next)
+    while True:
+        part = await next_part(iterator, None)
+        if part is None:
+            return
+        yield part
+
+
+def async_view(sync_view):
+    """Асинхронная обёртка над представлением DRF."""
+    sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        response = await sync_view(request, *args, **kwargs)
+        if response.streaming and not response.is_async:
+            response.streaming_content = iterate_in_thread(
+                response.streaming_content
+            )
+        return response
+
+    view.csrf_exempt = True
+    return view
+
+
+def viewset_view(viewset, basename, actions, detail):
+    """Представление вьюсета с теми же параметрами, что задаёт роутер."""
+    return async_view(
+        viewset.as_view(actions, basename=basename, detail=detail)
+    )
+
+
+recipe_list = viewset_view(RecipeViewSet, 'recipes', LIST_ACTIONS, False)
+recipe_detail = viewset_view(RecipeViewSet, 'recipes', DETAIL_ACTIONS, True)
+tag_list = viewset_view(TagViewSet, 'tags', {'get': 'list'}, False)
+tag_detail = viewset_view(TagViewSet, 'tags', {'get': 'retrieve'}, True)
+ingredient_list = viewset_view(
+    IngredientViewSet, 'ingredients', {'get': 'list'}, False
+)
+ingredient_detail = viewset_view(
+    IngredientViewSet, 'ingredients', {'get': 'retrieve'}, True
+)
@@ -0,0 +1,78 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+def token_cache():
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def token_cache_enabled():
+    """
+    Кэш включён, если его сброс при выходе и смене пароля увидят все
+    воркеры: кэш в памяти процесса годится только для одного воркера.
+    """
+    if settings.TOKEN_CACHE_TIMEOUT <= 0:
+        return False
+    return not (
+        isinstance(token_cache(), LocMemCache)
+        and settings.WEB_CONCURRENCY > 1
+    )
+
+
+def token_cache_key(key):
+    """Ключ кэша для токена; сам токен в кэше не хранится."""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(*keys):
+    token_cache().delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием id его пользователя.
+
+    Пользователь загружается из базы по первичному ключу без соединения с
+    таблицей токенов, поэтому request.user всегда свежий, а в кэше нет ни
+    токена, ни хэша пароля. Токен и пользователь читаются из основной базы:
+    запросы входа и регистрации не закрепляют клиента за ней, и реплика
+    может ещё не получить только что выданный токен.
+    """
+
+    def load_token(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.using(DEFAULT_DB_ALIAS).select_related(
+                'user'
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+    def authenticate_credentials(self, key):
+        if not token_cache_enabled():
+            return self.load_token(key)
+        cache = token_cache()
+        cache_key = token_cache_key(key)
+        user_id = cache.get(cache_key)
+        if user_id is None:
+            user, token = self.load_token(key)
+            cache.set(cache_key, user.pk, settings.TOKEN_CACHE_TIMEOUT)
+            return user, token
+        user = get_user_model().objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=user_id, is_active=True
+        ).first()
+        if user is None:
+            cache.delete(cache_key)
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, self.get_model()(key=key, user=user)
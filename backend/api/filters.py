@@ -1,27 +1,80 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from foodgram.models import Ingredient, Recipe, Tag
+from foodgram.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+
+from .ingredient_search import search_ingredients
+
+USER_RECIPE_MODELS = {
+    'is_favorited': Favorite,
+    'is_in_shopping_cart': ShoppingCart,
+}
 
 
 class IngredientFilter(filters.FilterSet):
     """Фильтр для поиска ингредиента по названию."""
-    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
 
+    def filter_name(self, queryset, name, value):
+        """Поиск с опечатками или, при INGREDIENT_FUZZY_SEARCH=False, по
+        началу названия."""
+        if not settings.INGREDIENT_FUZZY_SEARCH:
+            return queryset.filter(name__istartswith=value)
+        return search_ingredients(queryset, value)
+
 
 class RecipeFilter(filters.FilterSet):
     """Фильтр для поиска рецепта по автору."""
     tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
         queryset=Tag.objects.all(),
+        to_field_name='slug',
+        method='filter_tags'
+    )
+    is_favorited = filters.BooleanFilter(method='filter_user_recipes')
+    is_in_shopping_cart = filters.BooleanFilter(
+        method='filter_user_recipes'
     )
-    is_favorited = filters.BooleanFilter()
-    is_in_shopping_cart = filters.BooleanFilter()
 
     class Meta:
         model = Recipe
         fields = ['author', 'is_favorited', 'is_in_shopping_cart', 'tags']
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Рецепты хотя бы с одним из тегов. Полусоединение через EXISTS не
+        размножает рецепты с несколькими подходящими тегами; теги уже
+        загружены из базы при проверке slug, поэтому подзапрос обходится
+        без соединения с Tag.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=[tag.pk for tag in value]
+            )
+        ))
+
+    def filter_user_recipes(self, queryset, name, value):
+        """
+        Рецепты из избранного или корзины пользователя, начиная с последних
+        добавленных. Запрос идёт от строк пользователя по индексу
+        (user, -created_at), а не проверяет подзапросом каждый рецепт.
+        """
+        model = USER_RECIPE_MODELS[name]
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        if not value:
+            return queryset.exclude(Exists(
+                model.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        related = model._meta.get_field('recipe').related_query_name()
+        return queryset.filter(**{f'{related}__user': user}).order_by(
+            f'-{related}__created_at'
+        )
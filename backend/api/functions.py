@@ -2,16 +2,14 @@ from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from foodgram import relations
+
 from .serializers import RecipeMiniSerializer
 
 
 def create_favorite_cart(model, recipe, user):
     """Добавляет рецепт в избранное/корзину."""
-    instance, created = model.objects.get_or_create(
-        user=user,
-        recipe=recipe
-    )
-    if created:
+    if relations.add(model, user=user, recipe=recipe):
         serializer = RecipeMiniSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(
@@ -22,8 +20,7 @@ def create_favorite_cart(model, recipe, user):
 
 def delete_from_favorite_cart(model, recipe, user):
     """Удаляет рецепт из избранного/корзины."""
-    deleted_count, _ = model.objects.filter(user=user, recipe=recipe).delete()
-    if deleted_count > 0:
+    if relations.remove(model, user=user, recipe=recipe):
         return Response(status=status.HTTP_204_NO_CONTENT)
     return Response(
         {'error': f'Рецепт {recipe} не найден.'},
@@ -43,3 +40,30 @@ def get_recipes_limit(request):
                  'Параметр recipes_limit должен быть целым числом.'}
             )
     return None
+
+
+def get_requested_fields(query_params, serializer_class):
+    """
+    Получает набор полей ответа из параметров fields, omit и view=card.
+    None означает все поля сериализатора.
+    """
+    available = serializer_class.Meta.fields
+    fields = None
+    if query_params.get('view') == 'card':
+        fields = set(serializer_class.card_fields)
+    if query_params.get('fields'):
+        fields = {
+            name.strip() for name in query_params['fields'].split(',')
+        }
+    if query_params.get('omit'):
+        fields = set(available if fields is None else fields) - {
+            name.strip() for name in query_params['omit'].split(',')
+        }
+    if fields is None:
+        return None
+    unknown = fields - set(available)
+    if unknown:
+        raise ValidationError(
+            {'fields': f'Неизвестные поля: {", ".join(sorted(unknown))}.'}
+        )
+    return frozenset(fields)
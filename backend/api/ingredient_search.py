@@ -0,0 +1,156 @@
+"""Поиск ингредиентов по названию с опечатками.
+
+Запросы короче MIN_FUZZY_LENGTH символов ищутся по началу названия. Для
+более длинных на PostgreSQL используется pg_trgm: оператор %> (похожесть
+запроса на часть названия, word_similarity) по GIN-индексу триграмм с
+порогом INGREDIENT_SIMILARITY_THRESHOLD. На других базах отбор выполняет
+индекс триграмм в памяти процесса, построенный по таблице Ingredient:
+похожестью считается доля триграмм запроса, найденных в названии.
+Индекс перестраивается, когда меняется версия в таблице DataVersion: её
+увеличивают сигналы Ingredient и команды импорта, а база общая для всех
+воркеров и отдельных процессов команд. В выдаче сначала идут названия,
+начинающиеся с запроса, затем остальные по убыванию похожести.
+"""
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+from django.db.models import Case, F, IntegerField, Value, When
+
+from foodgram.models import DataVersion, Ingredient
+
+MIN_FUZZY_LENGTH = 3
+VERSION_KEY = 'ingredient-search'
+WORD_RE = re.compile(r'\w+')
+
+
+def bump_version():
+    """Сбрасывает индексы поиска во всех процессах."""
+    versions = DataVersion.objects.filter(key=VERSION_KEY)
+    if not versions.update(version=F('version') + 1):
+        _, created = DataVersion.objects.get_or_create(
+            key=VERSION_KEY, defaults={'version': 1}
+        )
+        if not created:
+            versions.update(version=F('version') + 1)
+
+
+def current_version():
+    return DataVersion.objects.filter(key=VERSION_KEY).values_list(
+        'version', flat=True
+    ).first() or 0
+
+
+def set_similarity_threshold(sender, connection, **kwargs):
+    """Порог оператора %> для соединений с PostgreSQL."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SET pg_trgm.word_similarity_threshold = %s',
+                [settings.INGREDIENT_SIMILARITY_THRESHOLD]
+            )
+
+
+connection_created.connect(
+    set_similarity_threshold, dispatch_uid='ingredient_search'
+)
+
+
+def trigrams(text):
+    """Триграммы слов как в pg_trgm: два пробела в начале, один в конце."""
+    result = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(
+            padded[index:index + 3] for index in range(len(padded) - 2)
+        )
+    return result
+
+
+class TrigramIndex:
+    """Индекс триграмм названий ингредиентов в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.names = {}
+        self.postings = {}
+
+    def build(self, version):
+        names = dict(Ingredient.objects.values_list('pk', 'name'))
+        postings = {}
+        for pk, name in names.items():
+            for trigram in trigrams(name):
+                postings.setdefault(trigram, []).append(pk)
+        self.names = {pk: name.lower() for pk, name in names.items()}
+        self.postings = postings
+        self.version = version
+
+    def ensure_current(self):
+        version = current_version()
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.build(version)
+
+    def search(self, value, limit):
+        """id ингредиентов в порядке выдачи."""
+        self.ensure_current()
+        query = trigrams(value)
+        if not query:
+            return []
+        hits = Counter()
+        for trigram in query:
+            hits.update(self.postings.get(trigram, ()))
+        value = value.lower()
+        threshold = settings.INGREDIENT_SIMILARITY_THRESHOLD
+        ranked = []
+        for pk, count in hits.items():
+            name = self.names[pk]
+            if name.startswith(value):
+                # Совпадения по началу — по алфавиту, как при поиске
+                # по префиксу.
+                ranked.append((0, 0, name, pk))
+            elif count / len(query) >= threshold:
+                ranked.append((1, -count, name, pk))
+        ranked.sort()
+        return [pk for *_, pk in ranked[:limit]]
+
+
+index = TrigramIndex()
+
+
+def prefix_rank(value):
+    return Case(
+        When(name__istartswith=value, then=Value(0)),
+        default=Value(1),
+        output_field=IntegerField()
+    )
+
+
+def search_ingredients(queryset, value):
+    """Ингредиенты, похожие на value, в порядке выдачи."""
+    value = value.strip()
+    if len(value) < MIN_FUZZY_LENGTH:
+        return queryset.filter(name__istartswith=value)
+    limit = settings.INGREDIENT_SEARCH_LIMIT
+    if connections[router.db_for_read(Ingredient)].vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        return queryset.filter(name__trigram_word_similar=value).annotate(
+            prefix=prefix_rank(value),
+            similarity=TrigramWordSimilarity(value, 'name')
+        ).order_by('prefix', '-similarity', 'name')[:limit]
+    ids = index.search(value, limit)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *[
+            When(pk=pk, then=Value(position))
+            for position, pk in enumerate(ids)
+        ],
+        output_field=IntegerField()
+    ))
@@ -0,0 +1,38 @@
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+
+class StreamingListMixin:
+    """
+    Отдаёт непагинированный список потоком JSON: queryset читается
+    порциями по STREAM_CHUNK_SIZE объектов, каждая порция сериализуется
+    и сразу отправляется клиенту.
+    """
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, JSONRenderer):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            self.stream_json(queryset, renderer),
+            content_type=renderer.media_type
+        )
+
+    def stream_json(self, queryset, renderer):
+        chunk_size = settings.STREAM_CHUNK_SIZE
+        objects = queryset.iterator(chunk_size=chunk_size)
+        separator = b''
+        yield b'['
+        while True:
+            chunk = list(islice(objects, chunk_size))
+            if not chunk:
+                break
+            # Рендерим порцию как массив и убираем внешние скобки.
+            body = renderer.render(self.get_serializer(chunk, many=True).data)
+            yield separator + body[1:-1]
+            separator = b','
+        yield b']'
@@ -1,6 +1,8 @@
 from django.conf import settings
 from rest_framework.pagination import PageNumberPagination
 
+from foodgram.paginator import EstimatedCountPaginator
+
 
 class Pagination(PageNumberPagination):
     """Пагинатор для вывода определённого количества элементов на странице."""
@@ -8,3 +10,4 @@ class Pagination(PageNumberPagination):
     page_query_param = 'page'
     max_page_size = settings.MAX_PAGE_SIZE
     page_size = settings.PAGE_SIZE
+    django_paginator_class = EstimatedCountPaginator
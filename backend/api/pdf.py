@@ -1,40 +1,158 @@
+"""Список покупок в PDF.
+
+Готовые файлы сохраняются в MEDIA_ROOT/shopping_lists под именем, равным
+хэшу списка ингредиентов, поэтому одинаковые корзины разных пользователей
+отдаются одним файлом без повторной отрисовки. При SHOPPING_LIST_ASYNC
+отрисовка выполняется фоновой задачей. Время изменения файла обновляется
+при каждой выдаче, а файлы, которые не запрашивали дольше
+SHOPPING_LIST_TTL_DAYS дней, удаляет команда purge_shopping_lists.
+reportlab импортируется только при отрисовке: остальным запросам и задачам
+он не нужен.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
 from io import BytesIO
 
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+from foodgram.jobs import job
+from foodgram_backend.metrics import observe
+
+FONT_NAME = 'DejaVuSans'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'DejaVuSans.ttf')
+SHOPPING_LIST_DIR = 'shopping_lists'
+# Меняется при изменении оформления, чтобы не отдавать старые файлы.
+LAYOUT_VERSION = 1
+
+
+def shopping_list_items(ingredients):
+    """Строки списка покупок: [название, единица, количество]."""
+    return [
+        [
+            item['ingredient__name'],
+            item['ingredient__measurement_unit'],
+            item['amount'],
+        ]
+        for item in ingredients
+    ]
+
+
+def shopping_list_digest(items):
+    data = json.dumps([LAYOUT_VERSION, items], ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def shopping_list_name(digest):
+    return f'{SHOPPING_LIST_DIR}/{digest}.pdf'
+
+
+def shopping_list_path(digest):
+    return os.path.join(settings.MEDIA_ROOT, shopping_list_name(digest))
 
 
-def pdf_creating(self, ingredients, username):
+def register_font():
+    """Загружает шрифт в reportlab один раз на процесс.
+
+    Вызывается и при старте gunicorn (gunicorn.conf.py), чтобы воркеры
+    получили уже разобранный шрифт от мастер-процесса.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def render_shopping_list(items):
+    """Отрисовывает список покупок и возвращает содержимое PDF."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    register_font()
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
-    # Регистрируем шрифт и устанавливаем его размер для всего документа.
-    pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
-    # p.setFont('DejaVuSans', 12)
-    # Устанавливаем заголовок документа
-    p.setFont('DejaVuSans', 20)
+    p.setFont(FONT_NAME, 20)
     p.drawString(100, height - 50, 'Список покупок')
     # Начальные параметры для размещения текста
     y_position = height - 100
     text_offset = 30  # Смещение между строками
-    for ingredient in ingredients:
-        text = f"-{ingredient['ingredient__name']}: {ingredient['amount']}"
-        f"{ingredient['ingredient__measurement_unit']}"
-        p.drawString(100, y_position, text.encode('utf-8').decode('utf-8'))
+    for name, measurement_unit, amount in items:
+        p.drawString(
+            100, y_position, f'- {name}: {amount} {measurement_unit}'
+        )
         y_position -= text_offset
         if y_position < 50:
             p.showPage()
-            p.setFont('DejaVuSans', 20)
+            p.setFont(FONT_NAME, 20)
             y_position = height - 100
     p.save()
-    buffer.seek(0)
-    response = HttpResponse(
-        buffer,
+    return buffer.getvalue()
+
+
+@job()
+def render_shopping_list_file(digest, items):
+    """Сохраняет PDF списка покупок, если его ещё нет на диске."""
+    path = shopping_list_path(digest)
+    if os.path.exists(path):
+        return {'file': shopping_list_name(digest)}
+    start = time.perf_counter()
+    content = render_shopping_list(items)
+    observe('foodgram_pdf_render_seconds', time.perf_counter() - start)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Запись во временный файл и переименование: параллельные отрисовки
+    # одного списка не отдадут клиенту недописанный файл.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(content)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return {'file': shopping_list_name(digest)}
+
+
+@job()
+def purge_shopping_lists(max_age_days):
+    """Удаляет файлы списков покупок, не запрашивавшиеся max_age_days дней."""
+    directory = os.path.join(settings.MEDIA_ROOT, SHOPPING_LIST_DIR)
+    deadline = time.time() - max_age_days * 24 * 60 * 60
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return {'removed': 0}
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < deadline:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Файл уже удалён параллельной очисткой.
+            continue
+    return {'removed': removed}
+
+
+def shopping_list_response(digest, username):
+    """Отдаёт готовый файл: через nginx при USE_X_ACCEL_REDIRECT."""
+    try:
+        # Отмечает использование файла, чтобы очистка его не удалила.
+        os.utime(shopping_list_path(digest))
+    except FileNotFoundError:
+        pass
+    filename = f'{username}_shopping_list.pdf'
+    if settings.USE_X_ACCEL_REDIRECT:
+        response = HttpResponse(content_type='application/pdf')
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_URL + shopping_list_name(digest)
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(
+        open(shopping_list_path(digest), 'rb'),
+        as_attachment=True,
+        filename=filename,
         content_type='application/pdf'
     )
-    response['Content-Disposition'] = 'attachment; '
-    f'filename="{username}_shopping_list.pdf"'
-    return response
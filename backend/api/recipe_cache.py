@@ -0,0 +1,75 @@
+"""Кэш сериализованных рецептов.
+
+Представление рецепта без флагов пользователя одинаково для всех, поэтому
+кэшируется по ключу (id, version): версия увеличивается при сохранении
+рецепта и изменении его тегов, ингредиентов или автора. Флаги
+is_favorited, is_in_shopping_cart и is_subscribed берутся из аннотаций
+запроса страницы, а ссылки на изображения достраиваются для текущего хоста.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.models import Follow, Recipe
+
+from .serializers import RecipeReadSerializer
+
+
+def fragment_key(recipe, fields=None):
+    key = f'recipe-fragment:{recipe.pk}:{recipe.version}'
+    if fields is not None:
+        key += ':' + ','.join(sorted(fields))
+    return key
+
+
+def page_queryset(queryset, user):
+    """Облегчённый queryset страницы: ключи кэша и флаги пользователя."""
+    return queryset.for_cached_representation(user, Follow)
+
+
+def load_fragments(recipe_ids, fields=None):
+    """Сериализует рецепты без флагов пользователя и абсолютных ссылок."""
+    recipes = Recipe.objects.for_representation(fields).filter(
+        pk__in=recipe_ids
+    )
+    context = {'fields': fields}
+    return {
+        recipe.pk: RecipeReadSerializer(recipe, context=context).data
+        for recipe in recipes
+    }
+
+
+def absolute_url(request, url):
+    return request.build_absolute_uri(url) if url else url
+
+
+def render_recipes(recipes, request, fields=None):
+    """Представление страницы рецептов из кэша с флагами пользователя."""
+    keys = {recipe.pk: fragment_key(recipe, fields) for recipe in recipes}
+    fragments = cache.get_many(keys.values())
+    missing = [pk for pk, key in keys.items() if key not in fragments]
+    if missing:
+        loaded = {
+            keys[pk]: fragment
+            for pk, fragment in load_fragments(missing, fields).items()
+        }
+        cache.set_many(loaded, settings.RECIPE_CACHE_TIMEOUT)
+        fragments.update(loaded)
+    results = []
+    for recipe in recipes:
+        fragment = fragments.get(keys[recipe.pk])
+        if fragment is None:
+            continue
+        data = dict(fragment)
+        if 'author' in data:
+            data['author'] = dict(
+                fragment['author'],
+                is_subscribed=recipe.is_subscribed,
+                avatar=absolute_url(request, fragment['author']['avatar'])
+            )
+        if 'image' in data:
+            data['image'] = absolute_url(request, fragment['image'])
+        for flag in ('is_favorited', 'is_in_shopping_cart'):
+            if flag in data:
+                data[flag] = getattr(recipe, flag)
+        results.append(data)
+    return results
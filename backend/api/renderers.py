@@ -0,0 +1,39 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from foodgram_backend.metrics import observe, view_label
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson; без orjson работает как стандартный."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        content = self.encode(data, accepted_media_type, renderer_context)
+        request = (renderer_context or {}).get('request')
+        if request is not None:
+            observe(
+                'foodgram_render_duration_seconds',
+                time.perf_counter() - start,
+                view=view_label(request)
+            )
+        return content
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS
+        )
@@ -2,8 +2,8 @@ from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from foodgram.models import (Follow, Ingredient, Recipe, RecipeIngredient, Tag,
-                             User)
+from foodgram.models import (Follow, Ingredient, Job, Recipe, RecipeIngredient,
+                             Tag, User)
 
 from .fields import Base64ImageField
 
@@ -182,8 +182,29 @@ class RecipeSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Оставляет в сериализаторе только поля из context['fields']."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для рецептов на чтение."""
+    card_fields = (
+        'id',
+        'tags',
+        'author',
+        'name',
+        'image',
+        'cooking_time',
+        'is_favorited',
+        'is_in_shopping_cart'
+    )
     tags = TagSerializer(many=True, read_only=True)
     ingredients = RecipeIngredientSerializer(
         source='recipeingredient',
@@ -259,3 +280,14 @@ class FollowSerializer(UserSerializer):
                 'Нельзя подписываться на самого себя!'
             )
         return value
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор для статуса фоновой задачи."""
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'result',
+            'created_at', 'started_at', 'finished_at'
+        )
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from foodgram.models import Ingredient, User
+
+from .authentication import invalidate_tokens
+from .ingredient_search import bump_version
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Сбрасывает кэш токена при выходе из системы."""
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает кэш токенов пользователя при изменении его данных."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_tokens(
+        *Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Сбрасывает индекс поиска ингредиентов."""
+    bump_version()
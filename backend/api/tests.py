@@ -0,0 +1,436 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connections
+from django.test import (AsyncRequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import async_views, ingredient_search, pdf
+from api.authentication import (CachedTokenAuthentication, token_cache,
+                                token_cache_key)
+from api.throttling import IPCostThrottle, heavy_requests
+from foodgram import relations
+from foodgram.models import (Favorite, FeedEntry, Follow, Ingredient, Recipe,
+                             ShoppingCart, Tag, User)
+from foodgram.paginator import EstimatedCountPaginator
+from foodgram_backend import db_router
+
+THREADS = 8
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    JOBS_EAGER=False,
+    SLOW_QUERY_MS=0,
+)
+class ConcurrentUpsertTests(TransactionTestCase):
+    """Параллельные добавления и удаления избранного, корзины и подписок."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            password='password'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                author=self.author,
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10
+            )
+            for number in range(3)
+        ]
+        self.recipe = self.recipes[0]
+
+    def concurrent_requests(self, method, path):
+        """Коды ответов THREADS одновременных запросов пользователя."""
+        barrier = threading.Barrier(THREADS)
+        codes = []
+        errors = []
+        lock = threading.Lock()
+
+        def request():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                response = getattr(client, method)(path)
+                with lock:
+                    codes.append(response.status_code)
+            except Exception as error:
+                with lock:
+                    errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=request) for _ in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return sorted(codes)
+
+    def assert_single_success(self, codes, success):
+        self.assertEqual(codes.count(success), 1, codes)
+        self.assertEqual(
+            codes.count(status.HTTP_400_BAD_REQUEST), THREADS - 1, codes
+        )
+
+    def test_favorite(self):
+        path = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.assert_single_success(
+            self.concurrent_requests('post', path), status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user).count(), 1
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+        self.assert_single_success(
+            self.concurrent_requests('delete', path),
+            status.HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_shopping_cart(self):
+        path = f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        self.assert_single_success(
+            self.concurrent_requests('post', path), status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.user).count(), 1
+        )
+        self.assert_single_success(
+            self.concurrent_requests('delete', path),
+            status.HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(
+            ShoppingCart.objects.filter(user=self.user).exists()
+        )
+
+    def test_subscribe(self):
+        path = f'/api/users/{self.author.pk}/subscribe/'
+        self.assert_single_success(
+            self.concurrent_requests('post', path), status.HTTP_201_CREATED
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(
+            set(
+                FeedEntry.objects.filter(user=self.user)
+                .values_list('recipe_id', flat=True)
+            ),
+            {recipe.pk for recipe in self.recipes}
+        )
+
+        self.assert_single_success(
+            self.concurrent_requests('delete', path),
+            status.HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SLOW_QUERY_MS=0)
+class UpdateSafeFieldsTests(TestCase):
+    """Полное сохранение не затирает счётчики, изменённые через F()."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10
+        )
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_avatar_update_keeps_followers_count(self):
+        # Объект автора загружен до подписки, как закэшированный
+        # request.user.
+        stale_author = User.objects.get(pk=self.author.pk)
+        relations.add(Follow, user=self.user, following=self.author)
+        client = APIClient()
+        client.force_authenticate(stale_author)
+        response = client.put(
+            '/api/users/me/avatar/', {'avatar': PIXEL}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertTrue(self.author.avatar)
+
+    def test_recipe_save_keeps_favorites_count(self):
+        stale_recipe = Recipe.objects.get(pk=self.recipe.pk)
+        relations.add(Favorite, user=self.user, recipe=self.recipe)
+        stale_recipe.name = 'Новое название'
+        stale_recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SLOW_QUERY_MS=0)
+class AsyncViewLimitsTests(TestCase):
+    """Асинхронные представления соблюдают троттлинг и лимит тяжёлых."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @staticmethod
+    @async_to_sync
+    async def get(view, path):
+        response = await view(AsyncRequestFactory().get(path))
+        if response.streaming:
+            response.content_parts = [part async for part in response]
+        return response
+
+    def test_heavy_request_cap(self):
+        acquired = 0
+        while heavy_requests.acquire(blocking=False):
+            acquired += 1
+        try:
+            response = self.get(
+                async_views.ingredient_list, '/api/ingredients/'
+            )
+        finally:
+            for _ in range(acquired):
+                heavy_requests.release()
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def test_cost_throttle(self):
+        with mock.patch.object(
+            IPCostThrottle, 'get_rate', return_value='15/min'
+        ):
+            codes = [
+                self.get(
+                    async_views.ingredient_list, '/api/ingredients/'
+                ).status_code
+                for _ in range(3)
+            ]
+        self.assertEqual(codes, [
+            status.HTTP_200_OK,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ])
+        # Слот тяжёлого запроса освобождается после отдачи тела.
+        self.assertTrue(heavy_requests.acquire(blocking=False))
+        heavy_requests.release()
+
+
+@override_settings(SLOW_QUERY_MS=0)
+class IngredientSearchIndexTests(TestCase):
+    """Индекс триграмм перестраивается по версии из базы."""
+
+    def setUp(self):
+        # Версия откатывается вместе с транзакцией предыдущего теста.
+        ingredient_search.index.version = None
+
+    def search(self, value):
+        return list(
+            ingredient_search.search_ingredients(
+                Ingredient.objects.all(), value
+            ).values_list('name', flat=True)
+        )
+
+    def test_bump_version_rebuilds_index(self):
+        Ingredient.objects.create(name='молоко', measurement_unit='мл')
+        self.assertEqual(self.search('малоко'), ['молоко'])
+        # Импорт в отдельном процессе: bulk_create без сигналов, кэш
+        # процесса не меняется, версия увеличивается в базе.
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='молоко топлёное', measurement_unit='мл')]
+        )
+        cache.clear()
+        self.assertEqual(self.search('малоко'), ['молоко'])
+        ingredient_search.bump_version()
+        self.assertEqual(
+            self.search('малоко'), ['молоко', 'молоко топлёное']
+        )
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SLOW_QUERY_MS=0)
+class RecipeTagFilterTests(TestCase):
+    """Фильтр по тегам проверяет slug по базе, а не по кэшу процесса."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            password='password'
+        )
+        self.breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=10
+        )
+        self.recipe.tags.add(self.breakfast)
+
+    def filter_ids(self, *slugs):
+        response = APIClient().get(
+            '/api/recipes/', {'tags': slugs, 'fields': 'id'}
+        )
+        if response.status_code != status.HTTP_200_OK:
+            return response.status_code
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_new_tag_is_accepted_at_once(self):
+        self.assertEqual(self.filter_ids('breakfast'), [self.recipe.pk])
+        # Тег, созданный другим процессом: сигналы здесь не срабатывают.
+        Tag.objects.bulk_create([Tag(name='Ужин', slug='dinner')])
+        self.assertEqual(self.filter_ids('dinner'), [])
+        self.assertEqual(
+            self.filter_ids('breakfast', 'dinner'), [self.recipe.pk]
+        )
+
+    def test_unknown_tag(self):
+        self.assertEqual(
+            self.filter_ids('unknown'), status.HTTP_400_BAD_REQUEST
+        )
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Оценка количества берётся только для выборок без фильтров."""
+
+    def test_table_estimate(self):
+        has_estimate = EstimatedCountPaginator.has_table_estimate
+        self.assertTrue(has_estimate(Recipe.all_objects.all()))
+        self.assertTrue(has_estimate(Recipe.objects.order_by('-id')))
+        self.assertTrue(has_estimate(User.objects.all()))
+        self.assertFalse(has_estimate(Recipe.objects.filter(name='x')))
+        self.assertFalse(has_estimate(Recipe.all_objects.filter(
+            deleted_at__isnull=False
+        )))
+        self.assertFalse(has_estimate(Recipe.objects.distinct()))
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    SLOW_QUERY_MS=0,
+    TOKEN_CACHE_TIMEOUT=60,
+    WEB_CONCURRENCY=1,
+)
+class CachedTokenAuthenticationTests(TestCase):
+    """В кэше токенов хранится только id пользователя."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def me(self):
+        return self.client.get('/api/users/me/')
+
+    def test_cache_stores_user_id(self):
+        self.assertEqual(self.me().status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            token_cache().get(token_cache_key(self.token.key)), self.user.pk
+        )
+
+    def test_user_is_loaded_fresh(self):
+        self.me()
+        # Изменения без сигналов, как из другого процесса.
+        User.objects.filter(pk=self.user.pk).update(username='renamed')
+        self.assertEqual(self.me().data['username'], 'renamed')
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(
+            self.me().status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_logout_revokes_cached_token(self):
+        self.me()
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.me().status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_token_is_read_from_primary(self):
+        # Чтения на реплику упали бы: такого алиаса нет в DATABASES.
+        routing = db_router._routing.set(
+            db_router.RoutingState('missing-replica')
+        )
+        self.addCleanup(db_router._routing.reset, routing)
+        authentication = CachedTokenAuthentication()
+        for _ in range(2):
+            user, token = authentication.authenticate_credentials(
+                self.token.key
+            )
+            self.assertEqual(user, self.user)
+
+    @override_settings(WEB_CONCURRENCY=4)
+    def test_process_local_cache_disabled_for_many_workers(self):
+        self.assertEqual(self.me().status_code, status.HTTP_200_OK)
+        self.assertIsNone(
+            token_cache().get(token_cache_key(self.token.key))
+        )
+
+
+class PurgeShoppingListsTests(TestCase):
+    """Очистка удаляет только давно не запрашивавшиеся списки покупок."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_file(self, digest, age_days):
+        path = pdf.shopping_list_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'%PDF')
+        mtime = time.time() - age_days * 24 * 60 * 60
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_purge(self):
+        old = self.make_file('old', 10)
+        served = self.make_file('served', 10)
+        fresh = self.make_file('fresh', 1)
+        pdf.shopping_list_response('served', 'user').close()
+        self.assertEqual(pdf.purge_shopping_lists(7), {'removed': 1})
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(served))
+        self.assertTrue(os.path.exists(fresh))
@@ -0,0 +1,182 @@
+"""Ограничение частоты и параллельности дорогих запросов.
+
+Каждый запрос расходует из лимита скоупа не единицу, а свою стоимость:
+REST_FRAMEWORK['THROTTLE_COSTS'] задаёт её для действий вьюсетов в виде
+'<basename>.<action>' (по умолчанию 1). Запросы со стоимостью не ниже
+HEAVY_REQUEST_COST считаются тяжёлыми: в одном процессе одновременно
+обрабатывается не больше MAX_CONCURRENT_HEAVY_REQUESTS таких запросов,
+остальные сразу получают 503.
+"""
+import threading
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import SimpleRateThrottle
+
+DEFAULT_HEAVY_REQUEST_COST = 10
+DEFAULT_MAX_CONCURRENT_HEAVY_REQUESTS = 2
+RETRY_AFTER = 1
+
+
+def configured_cost(view):
+    """Стоимость действия представления из THROTTLE_COSTS."""
+    costs = settings.REST_FRAMEWORK.get('THROTTLE_COSTS', {})
+    return costs.get(
+        f'{getattr(view, "basename", None)}.{getattr(view, "action", None)}',
+        1
+    )
+
+
+def request_cost(view):
+    """Стоимость запроса: get_request_cost() представления или настройка."""
+    get_request_cost = getattr(view, 'get_request_cost', None)
+    if get_request_cost is not None:
+        return get_request_cost()
+    return configured_cost(view)
+
+
+def is_heavy(view):
+    return request_cost(view) >= settings.REST_FRAMEWORK.get(
+        'HEAVY_REQUEST_COST', DEFAULT_HEAVY_REQUEST_COST
+    )
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    """Лимит на сумму стоимостей запросов за период."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.cost = request_cost(view)
+        self.history = self.cache.get(self.key, [])
+        self.now = self.timer()
+        while self.history and self.history[-1][0] <= self.now - self.duration:
+            self.history.pop()
+        used = sum(cost for _, cost in self.history)
+        if used + self.cost > self.num_requests:
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def throttle_success(self):
+        self.history.insert(0, (self.now, self.cost))
+        self.cache.set(self.key, self.history, self.duration)
+        return True
+
+    def wait(self):
+        """Время до освобождения лимита, достаточного для запроса."""
+        available = self.num_requests - sum(
+            cost for _, cost in self.history
+        )
+        for timestamp, cost in reversed(self.history):
+            available += cost
+            if available >= self.cost:
+                return max(self.duration - (self.now - timestamp), 0)
+        return None
+
+
+class UserCostThrottle(CostRateThrottle):
+    """Лимит аутентифицированного пользователя."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': request.user.pk
+        }
+
+
+class IPCostThrottle(CostRateThrottle):
+    """Лимит на все запросы с одного IP-адреса."""
+    scope = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self):
+        super().__init__()
+        # DRF превращает wait в заголовок Retry-After.
+        self.wait = RETRY_AFTER
+
+
+heavy_requests = threading.BoundedSemaphore(
+    settings.REST_FRAMEWORK.get(
+        'MAX_CONCURRENT_HEAVY_REQUESTS',
+        DEFAULT_MAX_CONCURRENT_HEAVY_REQUESTS
+    )
+)
+
+
+class ConcurrencyLimitMixin:
+    """Ограничивает число одновременных тяжёлых запросов в процессе."""
+    holds_heavy_slot = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if is_heavy(self):
+            if not heavy_requests.acquire(blocking=False):
+                raise Overloaded()
+            self.holds_heavy_slot = True
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Необработанная ошибка минует finalize_response.
+            if self.holds_heavy_slot:
+                self.holds_heavy_slot = False
+                heavy_requests.release()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.holds_heavy_slot:
+            self.holds_heavy_slot = False
+            if response.streaming:
+                # Потоковое тело формируется уже после возврата ответа:
+                # слот освобождается, когда оно отдано или закрыто.
+                response.streaming_content = ReleaseAfter(
+                    response.streaming_content
+                )
+            else:
+                heavy_requests.release()
+        return response
+
+
+class ReleaseAfter:
+    """Тело потокового ответа, освобождающее слот после отправки.
+
+    close() вызывается и при закрытии ответа сервером, если тело так и не
+    начали читать.
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.released = False
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.released:
+            self.released = True
+            heavy_requests.release()
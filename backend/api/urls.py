@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (IngredientViewSet, JobViewSet, RecipeViewSet, TagViewSet,
+                    UserViewSet)
 
 app_name = 'api'
 
@@ -10,8 +12,35 @@ v1_router.register('recipes', RecipeViewSet, basename='recipes')
 v1_router.register('tags', TagViewSet, basename='tags')
 v1_router.register('ingredients', IngredientViewSet, basename='ingredients')
 v1_router.register('users', UserViewSet, basename='users')
+v1_router.register('jobs', JobViewSet, basename='jobs')
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_API:
+    from . import async_views
+
+    urlpatterns += [
+        path('recipes/', async_views.recipe_list, name='recipes-list'),
+        path(
+            'recipes/<int:pk>/',
+            async_views.recipe_detail,
+            name='recipes-detail'
+        ),
+        path('tags/', async_views.tag_list, name='tags-list'),
+        path('tags/<int:pk>/', async_views.tag_detail, name='tags-detail'),
+        path(
+            'ingredients/',
+            async_views.ingredient_list,
+            name='ingredients-list'
+        ),
+        path(
+            'ingredients/<int:pk>/',
+            async_views.ingredient_detail,
+            name='ingredients-detail'
+        ),
+    ]
+
+urlpatterns += [
     path('', include(v1_router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,27 +1,43 @@
+import os
+
+from django.conf import settings
 from django.db.models import Sum
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.functional import cached_property
 from djoser.views import UserViewSet
-from rest_framework import permissions, status, viewsets
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from foodgram.models import (Favorite, Follow, Ingredient, Recipe,
+from foodgram import relations
+from foodgram.deletion import soft_delete_recipes, soft_delete_users
+from foodgram.feed import feed_queryset
+from foodgram.jobs import enqueue
+from foodgram.models import (Favorite, Follow, Ingredient, Job, Recipe,
                              RecipeIngredient, ShoppingCart, Tag, User)
 
 from .filters import IngredientFilter, RecipeFilter
-from .functions import create_favorite_cart, delete_from_favorite_cart
+from .functions import (create_favorite_cart, delete_from_favorite_cart,
+                        get_requested_fields)
+from .mixins import StreamingListMixin
 from .pagination import Pagination
-from .pdf import pdf_creating
+from .pdf import (render_shopping_list_file, shopping_list_digest,
+                  shopping_list_items, shopping_list_path,
+                  shopping_list_response)
 from .permissions import IsAuthorOrReadOnly
+from .recipe_cache import page_queryset, render_recipes
 from .serializers import (AvatarSerializer, FollowSerializer,
-                          IngredientListSerializer, RecipeReadSerializer,
-                          RecipeSerializer, TagSerializer, UserSerializer)
+                          IngredientListSerializer, JobSerializer,
+                          RecipeReadSerializer, RecipeSerializer,
+                          TagSerializer, UserSerializer)
+from .throttling import ConcurrencyLimitMixin, configured_cost
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(ConcurrencyLimitMixin, UserViewSet):
     """Представление для Пользователя."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -29,6 +45,9 @@ class UserViewSet(UserViewSet):
     http_method_names = ['get', 'post', 'put', 'delete']
     permission_classes = (AllowAny,)
 
+    def perform_destroy(self, instance):
+        soft_delete_users(User.objects.filter(pk=instance.pk))
+
     @action(
         detail=True,
         methods=['post'],
@@ -46,11 +65,7 @@ class UserViewSet(UserViewSet):
                 {'error': 'Нельзя подписываться на самого себя!'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        _, created = Follow.objects.get_or_create(
-            user=user,
-            following=author
-        )
-        if created:
+        if relations.add(Follow, user=user, following=author):
             serializer = FollowSerializer(author, context=serializer_context)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(
@@ -70,11 +85,7 @@ class UserViewSet(UserViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         user = request.user
-        deleted_count, _ = Follow.objects.filter(
-            user=user,
-            following=author
-        ).delete()
-        if deleted_count > 0:
+        if relations.remove(Follow, user=user, following=author):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'error': f'Подписка на автора {author} не найдена.'},
@@ -142,7 +153,7 @@ class UserViewSet(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConcurrencyLimitMixin, viewsets.ModelViewSet):
     """Представление для Рецептов."""
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
@@ -151,10 +162,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = Pagination
     filterset_class = RecipeFilter
 
+    @cached_property
+    def requested_fields(self):
+        """Поля рецепта, запрошенные параметрами fields, omit и view."""
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        return get_requested_fields(
+            self.request.query_params, RecipeReadSerializer
+        )
+
     def get_queryset(self):
         user = self.request.user
         return Recipe.objects.with_user_annotations(
-            user, Favorite, ShoppingCart, Recipe)
+            user, Favorite, ShoppingCart, Recipe,
+            fields=self.requested_fields)
+
+    def perform_destroy(self, instance):
+        soft_delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.requested_fields
+        return context
 
     def get_serializer_class(self):
         """Определяем тип Сериализатора."""
@@ -162,6 +191,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeSerializer
 
+    def get_cached_page(self, queryset):
+        """Страница рецептов из кэша представлений."""
+        page = self.paginate_queryset(
+            page_queryset(queryset, self.request.user)
+        )
+        return self.get_paginated_response(
+            render_recipes(page, self.request, self.requested_fields)
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_page(self.filter_queryset(self.get_queryset()))
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        return self.get_cached_page(self.filter_queryset(
+            feed_queryset(request.user, self.get_queryset())
+        ))
+
     @action(detail=True, url_path='get-link', url_name='get-link')
     def get_link(self, request, pk=None):
         """Получение короткой ссылки на рецепт."""
@@ -218,12 +266,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_download_shopping_cart(self, request):
         ingredients = RecipeIngredient.objects.filter(
-            recipe__recipe_shoppingcart__user=request.user
+            recipe__recipe_shoppingcart__user=request.user,
+            recipe__deleted_at__isnull=True
         ).values(
             'ingredient__name',
             'ingredient__measurement_unit'
         ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-        return pdf_creating(self, ingredients, request.user.username)
+        items = shopping_list_items(ingredients)
+        digest = shopping_list_digest(items)
+        if not os.path.exists(shopping_list_path(digest)):
+            if not settings.SHOPPING_LIST_ASYNC:
+                render_shopping_list_file(digest, items)
+            else:
+                job = enqueue(
+                    render_shopping_list_file,
+                    user=request.user,
+                    unique=True,
+                    digest=digest,
+                    items=items
+                )
+                location = request.build_absolute_uri(
+                    reverse('api:jobs-detail', args=[job.pk])
+                )
+                return Response(
+                    JobSerializer(job).data,
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': location}
+                )
+        return shopping_list_response(digest, request.user.username)
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -234,10 +304,30 @@ class TagViewSet(viewsets.ModelViewSet):
     http_method_names = ['get']
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ConcurrencyLimitMixin, StreamingListMixin,
+                        viewsets.ModelViewSet):
     """Представление для Ингредиентов."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientListSerializer
     pagination_class = None
     filterset_class = IngredientFilter
     http_method_names = ['get']
+
+    def get_request_cost(self):
+        """Поиск по названию дешёвый, дорог только полный список."""
+        if self.action == 'list' and not self.request.query_params.get(
+            'name'
+        ):
+            return configured_cost(self)
+        return 1
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Статус фоновой задачи, поставленной пользователем."""
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
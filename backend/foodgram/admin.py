@@ -1,14 +1,45 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Count
 
-from .models import (Favorite, Follow, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+from .counters import recount_favorites, recount_followers
+from .deletion import soft_delete_recipes, soft_delete_users
+from .jobs import enqueue
+from .models import (Favorite, Follow, Ingredient, Job, Recipe,
+                     RecipeIngredient, ShoppingCart, Tag)
+from .paginator import EstimatedCountPaginator
 
 User = get_user_model()
 
 
+class EstimatedCountAdmin(admin.ModelAdmin):
+    """Админка больших таблиц без точного подсчёта строк."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class SoftDeleteAdminMixin:
+    """Удаление пометкой без сбора связанных объектов в памяти."""
+    soft_delete = None
+    delete_preview_size = 100
+
+    def get_deleted_objects(self, objs, request):
+        count = len(objs) if isinstance(objs, list) else objs.count()
+        preview = [str(obj) for obj in objs[:self.delete_preview_size]]
+        return (
+            preview,
+            {self.model._meta.verbose_name_plural: count},
+            set(),
+            []
+        )
+
+    def delete_model(self, request, obj):
+        self.soft_delete(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(queryset)
+
+
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
@@ -16,32 +47,60 @@ class RecipeIngredientInline(admin.TabularInline):
     autocomplete_fields = ['ingredient']
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdminMixin, EstimatedCountAdmin):
     model = Recipe
+    soft_delete = staticmethod(soft_delete_recipes)
     list_display = ['author', 'name', 'favorites_count']
     list_filter = ['tags']
-    search_fields = ['author__username', 'name']
-    actions = ['delete_selected']
+    # Префикс названия ищется по индексу UPPER(name) text_pattern_ops на
+    # PostgreSQL (миграция 0011).
+    search_fields = ['^name', '=author__username']
+    autocomplete_fields = ['author']
+    readonly_fields = ['favorites_count']
+    actions = ['delete_selected', 'recount']
     inlines = (RecipeIngredientInline,)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorites_count=Count('recipe_favorite'))
-        return queryset
+    @admin.action(description='Пересчитать количество добавлений в избранное')
+    def recount(self, request, queryset):
+        job = enqueue(
+            recount_favorites,
+            user=request.user,
+            recipe_ids=list(queryset.values_list('pk', flat=True))
+        )
+        self.message_user(
+            request, f'Пересчёт поставлен в очередь: задача #{job.pk}.'
+        )
 
-    @admin.display(
-        description='Количество добавлений в избранное'
-    )
-    def favorites_count(self, obj):
-        return obj.favorites_count
+    def get_queryset(self, request):
+        # Автор нужен и в списке, и в подписях автодополнения рецептов.
+        return super().get_queryset(request).select_related('author')
 
 
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(SoftDeleteAdminMixin, BaseUserAdmin):
     model = User
+    soft_delete = staticmethod(soft_delete_users)
     add_fieldsets = BaseUserAdmin.add_fieldsets + (
         (None, {'fields': ('email', 'username', 'first_name', 'last_name')}),
     )
-    search_fields = ['email', 'username']
+    list_display = BaseUserAdmin.list_display + ('followers_count',)
+    # Точное совпадение email и префикс username: на PostgreSQL поиск идёт
+    # по индексам UPPER(email) и UPPER(username) text_pattern_ops (миграция
+    # 0011), а не полным перебором таблицы.
+    search_fields = ['=email', '^username']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['recount']
+
+    @admin.action(description='Пересчитать количество подписчиков')
+    def recount(self, request, queryset):
+        job = enqueue(
+            recount_followers,
+            user=request.user,
+            user_ids=list(queryset.values_list('pk', flat=True))
+        )
+        self.message_user(
+            request, f'Пересчёт поставлен в очередь: задача #{job.pk}.'
+        )
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -57,19 +116,43 @@ class IngredientAdmin(admin.ModelAdmin):
     actions = ['delete_selected']
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class UserRecipeAdmin(EstimatedCountAdmin):
+    """Связи пользователя с рецептом: строки списка без лишних запросов."""
+    list_display = ['user', 'recipe', 'created_at']
+    # Recipe.__str__ обращается к автору рецепта.
+    list_select_related = ['user', 'recipe__author']
+    search_fields = ['=user__email', '=user__username']
+    autocomplete_fields = ['user', 'recipe']
+
+
+class FavoriteAdmin(UserRecipeAdmin):
     model = Favorite
-    list_display = ['user', 'recipe']
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(EstimatedCountAdmin):
     model = Follow
     list_display = ['user', 'following']
+    list_select_related = ['user', 'following']
+    search_fields = ['=user__email', '=user__username']
+    autocomplete_fields = ['user', 'following']
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(UserRecipeAdmin):
     model = ShoppingCart
-    list_display = ['user', 'recipe']
+
+
+class JobAdmin(EstimatedCountAdmin):
+    model = Job
+    list_display = ['name', 'status', 'attempts', 'created_at', 'user']
+    list_filter = ['status', 'name']
+    list_select_related = ['user']
+    readonly_fields = [
+        'name', 'payload', 'user', 'status', 'attempts', 'max_attempts',
+        'run_at', 'started_at', 'finished_at', 'result', 'error'
+    ]
+
+    def has_add_permission(self, request):
+        return False
 
 
 admin.site.register(Tag, TagAdmin)
@@ -79,4 +162,5 @@ admin.site.register(User, UserAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(Job, JobAdmin)
 admin.site.empty_value_display = 'Не задано'
@@ -5,3 +5,10 @@ class FoodgramConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'foodgram'
     verbose_name = 'Проект Фудграм'
+
+    def ready(self):
+        from foodgram_backend import slow_queries
+
+        # Модули с фоновыми задачами регистрируют их при импорте.
+        from . import counters, deletion, feed, signals  # noqa: F401
+        slow_queries.setup()
@@ -0,0 +1,42 @@
+"""Пересчёт денормализованных счётчиков.
+
+Счётчики поддерживаются функциями foodgram.relations при добавлении и
+удалении подписок и избранного. Массовые операции, которые их обходят,
+пересчитывают затронутые строки этими функциями.
+"""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .jobs import job
+from .models import Favorite, Follow, Recipe, User
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0
+    )
+
+
+@job()
+def recount_followers(user_ids=None):
+    """Пересчитывает followers_count (всех пользователей при None)."""
+    users = User.all_objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    return users.update(followers_count=count_subquery(Follow, 'following'))
+
+
+@job()
+def recount_favorites(recipe_ids=None):
+    """Пересчитывает favorites_count (всех рецептов при None)."""
+    recipes = Recipe.all_objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    return recipes.update(favorites_count=count_subquery(Favorite, 'recipe'))
@@ -0,0 +1,97 @@
+"""Лента подписок: рецепты раскладываются по «входящим» подписчиков.
+
+При публикации рецепт пакетами записывается в FeedEntry каждого
+подписчика автора, поэтому чтение ленты — один проход по индексу
+(user, -pub_date). Рецепты авторов, у которых подписчиков больше
+FEED_FANOUT_MAX_FOLLOWERS, не раскладываются, а подмешиваются запросом
+при чтении ленты.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from .jobs import job
+from .models import FeedEntry, Follow, Recipe
+
+
+def is_pulled(author):
+    """Рецепты автора читаются запросом, а не из ленты."""
+    return author.followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out(recipe):
+    """Добавляет рецепт в ленты подписчиков автора."""
+    if is_pulled(recipe.author):
+        return
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    follower_ids = Follow.objects.filter(
+        following_id=recipe.author_id
+    ).order_by('pk').values_list('user_id', flat=True).iterator(
+        chunk_size=batch_size
+    )
+    while True:
+        batch = list(islice(follower_ids, batch_size))
+        if not batch:
+            break
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe.pk,
+                    pub_date=recipe.pub_date
+                )
+                for user_id in batch
+            ],
+            ignore_conflicts=True
+        )
+
+
+@job()
+def fan_out_recipe(recipe_id):
+    """Фоновая задача раскладки рецепта по лентам."""
+    recipe = Recipe.objects.select_related('author').filter(
+        pk=recipe_id
+    ).first()
+    if recipe is not None:
+        fan_out(recipe)
+
+
+def add_author(user, author):
+    """Добавляет последние рецепты автора в ленту нового подписчика."""
+    if is_pulled(author):
+        return
+    recipes = Recipe.objects.filter(author=author).values_list(
+        'pk', 'pub_date'
+    )[:settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user=user, recipe_id=recipe_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        ],
+        ignore_conflicts=True
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id,
+        recipe__author_id=author_id
+    ).delete()
+
+
+def feed_queryset(user, queryset):
+    """Ограничивает queryset рецептов лентой пользователя."""
+    pulled_authors = Follow.objects.filter(
+        user=user,
+        following__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('following')
+    if not pulled_authors.exists():
+        return queryset.filter(feed_entries__user=user).order_by(
+            '-feed_entries__pub_date'
+        )
+    return queryset.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe'))
+        | Q(author__in=pulled_authors)
+    )
@@ -0,0 +1,170 @@
+"""Очередь фоновых задач в таблице базы данных.
+
+Функции, помеченные декоратором job, ставятся в очередь вызовом enqueue и
+выполняются воркерами команды run_workers. Воркеры забирают задачи через
+SELECT ... FOR UPDATE SKIP LOCKED (где база это поддерживает) и условный
+UPDATE статуса, поэтому одну задачу не выполнят два воркера. Упавшая
+задача повторяется с экспоненциальной задержкой, пока не исчерпает
+max_attempts; задачи воркеров, завершившихся аварийно, по истечении
+JOB_TIMEOUT возвращаются в очередь.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connections,
+                       router, transaction)
+from django.db.models import F
+from django.utils import timezone
+
+from foodgram_backend.slow_queries import query_source
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+def job(max_attempts=None):
+    """Регистрирует функцию как фоновую задачу."""
+    def decorator(func):
+        func.job_name = func.__name__
+        func.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        REGISTRY[func.job_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, user=None, unique=False, **payload):
+    """Ставит задачу в очередь.
+
+    С unique=True новая задача не создаётся, если такая же задача того же
+    пользователя уже ждёт в очереди. При JOBS_EAGER=True задача
+    выполняется сразу после коммита текущей транзакции, без воркеров.
+    """
+    if unique:
+        queued = Job.objects.filter(
+            name=func.job_name,
+            payload=payload,
+            user=user,
+            status=Job.QUEUED
+        ).first()
+        if queued is not None:
+            return queued
+    new_job = Job.objects.create(
+        name=func.job_name,
+        payload=payload,
+        user=user,
+        max_attempts=func.max_attempts
+    )
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: start(new_job) and execute(new_job))
+    return new_job
+
+
+def start(job):
+    """Переводит задачу в статус «выполняется», если её не забрали."""
+    now = timezone.now()
+    started = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+        status=Job.RUNNING,
+        started_at=now,
+        attempts=F('attempts') + 1
+    )
+    if started:
+        job.status = Job.RUNNING
+        job.started_at = now
+        job.attempts += 1
+    return bool(started)
+
+
+def claim():
+    """Забирает первую готовую к запуску задачу или возвращает None."""
+    connection = connections[router.db_for_write(Job)]
+    queryset = Job.objects.filter(
+        status=Job.QUEUED,
+        run_at__lte=timezone.now()
+    ).order_by('run_at')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=connection.alias):
+            job = queryset.select_for_update(skip_locked=True).first()
+            if job is not None and start(job):
+                return job
+        return None
+    # Без SKIP LOCKED задачу за воркером закрепляет условный UPDATE.
+    job = queryset.first()
+    if job is not None and start(job):
+        return job
+    return None
+
+
+def execute(job):
+    """Выполняет задачу и сохраняет результат или ошибку."""
+    fields = ['status', 'result', 'error', 'run_at', 'finished_at']
+    try:
+        func = REGISTRY.get(job.name)
+        if func is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована.')
+        with query_source(f'job:{job.name}'):
+            job.result = func(**job.payload)
+    except Exception:
+        logger.exception('Ошибка выполнения задачи %s #%s.', job.name, job.pk)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.save(update_fields=fields)
+    return job
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, воркер которых завершился аварийно."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT)
+    )
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED,
+        run_at=now
+    )
+    stale.update(
+        status=Job.FAILED,
+        error='Превышено время выполнения задачи.',
+        finished_at=now
+    )
+    return requeued
+
+
+def work(stop, poll_interval, once=False):
+    """Цикл воркера: выполняет задачи, пока не установлено событие stop.
+
+    С once=True воркер завершается, когда очередь опустеет.
+    """
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim()
+            except DatabaseError:
+                logger.exception('Ошибка получения задачи из очереди.')
+                stop.wait(poll_interval)
+                continue
+            if job is not None:
+                execute(job)
+            elif once:
+                return
+            else:
+                stop.wait(poll_interval)
+    finally:
+        connections.close_all()
@@ -0,0 +1,75 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: отправляет параллельные GET-запросы к запущенному '
+        'серверу и выводит пропускную способность и задержки. Позволяет '
+        'сравнить режимы SERVER_MODE=wsgi и SERVER_MODE=asgi.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'url',
+            help='Адрес, например http://127.0.0.1:9123/api/recipes/'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Количество одновременных соединений.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Общее количество запросов.'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для заголовка Authorization.'
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                with urlopen(
+                    Request(options['url'], headers=headers),
+                    timeout=options['timeout']
+                ) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (HTTPError, URLError, OSError):
+                ok = False
+            return ok, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for ok, _ in results if not ok)
+        self.stdout.write(
+            f'Запросов: {len(results)}, ошибок: {errors}, '
+            f'время: {elapsed:.2f} с, RPS: {len(results) / elapsed:.1f}'
+        )
+        self.stdout.write(
+            'Задержка, мс: p50={:.1f} p95={:.1f} p99={:.1f} max={:.1f}'.format(
+                statistics.median(latencies) * 1000,
+                latencies[int(len(latencies) * 0.95) - 1] * 1000,
+                latencies[int(len(latencies) * 0.99) - 1] * 1000,
+                latencies[-1] * 1000,
+            )
+        )
@@ -0,0 +1,57 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+from api.serializers import IngredientListSerializer, RecipeReadSerializer
+from foodgram.models import Ingredient, Recipe
+from foodgram_backend.compression import brotli
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга JSON стандартным и быстрым '
+        'рендерером и размер ответов без сжатия, с gzip и brotli.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Количество повторов рендеринга.'
+        )
+
+    def handle(self, *args, **options):
+        payloads = {
+            'ingredients': IngredientListSerializer(
+                Ingredient.objects.all(), many=True
+            ).data,
+            'recipes': RecipeReadSerializer(
+                Recipe.objects.for_representation()[:20], many=True
+            ).data,
+        }
+        for name, data in payloads.items():
+            self.stdout.write(f'{name}:')
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    content = renderer.render(data)
+                elapsed = (time.perf_counter() - started) / options['repeat']
+                self.stdout.write(
+                    f'  {type(renderer).__name__}: '
+                    f'{elapsed * 1000:.2f} мс на ответ'
+                )
+            sizes = [
+                ('без сжатия', len(content)),
+                ('gzip', len(gzip.compress(content, compresslevel=6))),
+            ]
+            if brotli is not None:
+                sizes.append(
+                    ('brotli', len(brotli.compress(content, quality=5)))
+                )
+            self.stdout.write('  размер: ' + ', '.join(
+                f'{label} {size} байт' for label, size in sizes
+            ))
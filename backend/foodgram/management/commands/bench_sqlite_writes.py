@@ -0,0 +1,139 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+MODES = (
+    ('стандартный sqlite3', 'django.db.backends.sqlite3', {}),
+    ('foodgram_backend.sqlite', 'foodgram_backend.sqlite', None),
+)
+ALIAS = 'bench_sqlite_writes'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентную запись в SQLite стандартным бэкендом и '
+        'foodgram_backend.sqlite: потоки в транзакциях читают и '
+        'увеличивают счётчики во временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Количество пишущих потоков.'
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=200,
+            help='Количество транзакций в каждом потоке.'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10,
+            help='Количество счётчиков, за которые конкурируют потоки.'
+        )
+
+    def handle(self, *args, **options):
+        for label, engine, sqlite_options in MODES:
+            with tempfile.TemporaryDirectory() as directory:
+                if sqlite_options is None:
+                    sqlite_options = connections['default'].settings_dict.get(
+                        'OPTIONS', {}
+                    )
+                # configure_settings заполняет недостающие ключи настроек
+                # и требует алиас default.
+                connections.settings[ALIAS] = connections.configure_settings({
+                    'default': {
+                        'ENGINE': engine,
+                        'NAME': os.path.join(directory, 'bench.sqlite3'),
+                        'OPTIONS': sqlite_options,
+                    }
+                })['default']
+                try:
+                    self.run_mode(label, options)
+                finally:
+                    connections[ALIAS].close()
+                    del connections[ALIAS]
+                    del connections.settings[ALIAS]
+
+    def run_mode(self, label, options):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE counter '
+                '(id INTEGER PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            cursor.executemany(
+                'INSERT INTO counter (id, value) VALUES (%s, 0)',
+                [(row,) for row in range(options['rows'])]
+            )
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(number):
+            try:
+                for operation in range(options['operations']):
+                    row = (number + operation) % options['rows']
+                    started = time.perf_counter()
+                    try:
+                        self.increment(row)
+                    except OperationalError:
+                        with lock:
+                            errors.append(row)
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connections[ALIAS].close()
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT SUM(value) FROM counter')
+            total = cursor.fetchone()[0]
+        self.stdout.write(f'{label}:')
+        self.stdout.write(
+            f'  успешно: {len(latencies)}, ошибок блокировки: {len(errors)}, '
+            f'{len(latencies) / elapsed:.0f} транзакций/с'
+        )
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f'  задержка: медиана '
+                f'{statistics.median(latencies) * 1000:.1f} мс, p95 '
+                f'{latencies[int(len(latencies) * 0.95)] * 1000:.1f} мс'
+            )
+        self.stdout.write(
+            f'  сумма счётчиков: {total} '
+            f'({"совпадает" if total == len(latencies) else "расходится"})'
+        )
+
+    @staticmethod
+    def increment(row):
+        """Чтение и запись в одной транзакции, как в get_or_create."""
+        with transaction.atomic(using=ALIAS):
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute(
+                    'SELECT value FROM counter WHERE id = %s', [row]
+                )
+                value = cursor.fetchone()[0]
+                cursor.execute(
+                    'UPDATE counter SET value = %s WHERE id = %s',
+                    [value + 1, row]
+                )
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+# Загрузка приложения так же, как в gunicorn.conf.py: WSGI-приложение и
+# URLconf со всеми представлениями.
+STARTUP_CODE = (
+    'import foodgram_backend.wsgi\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время запуска приложения в отдельном процессе и '
+        'показывает стоимость импорта модулей по данным python -X importtime.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Сколько самых дорогих пакетов и модулей показать.'
+        )
+
+    def handle(self, *args, **options):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings'
+            )
+        )
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - started
+        if process.returncode:
+            self.stderr.write(process.stderr)
+            return
+        modules = []
+        packages = defaultdict(int)
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            try:
+                self_us, cumulative_us, name = line[12:].split('|')
+                self_us, cumulative_us = int(self_us), int(cumulative_us)
+            except ValueError:
+                continue
+            name = name.strip()
+            modules.append((cumulative_us, name))
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write(f'Запуск приложения: {elapsed * 1000:.0f} мс')
+        self.stdout.write(
+            f'Импорт модулей: {sum(packages.values()) / 1000:.0f} мс'
+        )
+        self.stdout.write('Пакеты (собственное время модулей):')
+        for name, self_us in sorted(
+            packages.items(), key=lambda item: -item[1]
+        )[:options['top']]:
+            self.stdout.write(f'  {name}: {self_us / 1000:.1f} мс')
+        self.stdout.write('Модули (с вложенными импортами):')
+        for cumulative_us, name in sorted(modules, reverse=True)[
+            :options['top']
+        ]:
+            self.stdout.write(f'  {name}: {cumulative_us / 1000:.1f} мс')
@@ -0,0 +1,81 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from foodgram.models import Recipe
+
+
+def recipe_to_dict(recipe):
+    """Представление рецепта для выгрузки вместе со связанными данными."""
+    return {
+        'id': recipe.pk,
+        'author': {
+            'email': recipe.author.email,
+            'username': recipe.author.username,
+        },
+        'name': recipe.name,
+        'text': recipe.text,
+        'image': recipe.image.name or None,
+        'cooking_time': recipe.cooking_time,
+        'short_link': recipe.short_link,
+        'pub_date': recipe.pub_date.isoformat(),
+        'tags': [
+            {'name': tag.name, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipeingredient.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый экспорт рецептов с ингредиентами, тегами и авторами '
+        'в файл JSON Lines.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки, по умолчанию стандартный вывод.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Количество рецептов, читаемых из базы за один раз.'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            'recipeingredient__ingredient'
+        ).order_by('pk')
+        path = options['path']
+        output = (
+            sys.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8')
+        )
+        exported = 0
+        try:
+            for recipe in queryset.iterator(chunk_size=options['chunk_size']):
+                output.write(
+                    json.dumps(recipe_to_dict(recipe), ensure_ascii=False)
+                )
+                output.write('\n')
+                exported += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(
+            self.style.SUCCESS(f'Выгружено рецептов: {exported}.')
+        )
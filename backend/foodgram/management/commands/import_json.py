@@ -1,60 +1,223 @@
+import csv
 import json
 import os
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.ingredient_search import bump_version
 from foodgram.models import Ingredient
 
+READ_CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ['name', 'measurement_unit']
+
+
+def iter_json_array(file):
+    """Потоково читает элементы JSON-массива, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидался JSON-массив.')
+    position = 1
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            item = end = None
+        if end is None or (end == len(buffer) and not eof):
+            chunk = file.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            if eof and position >= len(buffer):
+                raise ValueError('Неожиданный конец JSON-массива.')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def iter_json_lines(file):
+    """Читает файл в формате JSON Lines (один объект на строку)."""
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(file):
+    """Читает CSV вида `название,единица измерения`."""
+    for row in csv.reader(file):
+        if row == CSV_HEADER:
+            continue
+        yield dict(zip(CSV_HEADER, row))
+
+
+READERS = {
+    'json': iter_json_array,
+    'jsonl': iter_json_lines,
+    'csv': iter_csv,
+}
+
 
 class Command(BaseCommand):
-    help = 'Импорт ингредиентов из файла JSON'
+    help = (
+        'Импорт ингредиентов из файла JSON, JSON Lines или CSV. '
+        'Файл читается потоково и сохраняется пакетами: новые ингредиенты '
+        'добавляются, уже существующие пропускаются.'
+    )
 
-    def handle(self, *args, **kwargs):
-        json_file_path = os.path.join(
-            settings.BASE_DIR,
-            'ingredients.json'
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.json'),
+            help='Путь к файлу (по умолчанию ingredients.json).'
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одной транзакции.'
+        )
+        parser.add_argument(
+            '--offset',
+            type=int,
+            default=0,
+            help='Пропустить первые N записей файла '
+                 '(продолжение прерванного импорта).'
         )
+        parser.add_argument(
+            '--update-units',
+            action='store_true',
+            help='Обновлять единицу измерения у ингредиента с тем же '
+                 'названием, если он в базе единственный.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or self.detect_format(path)
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        self.update_units = options['update_units']
+        self.stats = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        processed = options['offset']
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                records = islice(READERS[file_format](f), processed, None)
+                while True:
+                    batch = list(islice(records, batch_size))
+                    if not batch:
+                        break
+                    self.save_batch(batch)
+                    processed += len(batch)
+                    self.stdout.write(f'Обработано записей: {processed}')
         except FileNotFoundError:
-            self.stderr.write(
-                self.style.ERROR(f'Файл {json_file_path} не найден.')
+            raise CommandError(f'Файл {path} не найден.')
+        except (ValueError, csv.Error) as e:
+            raise CommandError(
+                f'Ошибка чтения файла после записи {processed}: {e}. '
+                f'Для продолжения запустите импорт с --offset {processed}.'
             )
-            return
-        except json.JSONDecodeError:
-            self.stderr.write(
-                self.style.ERROR('Ошибка в процессе декодирования JSON.')
-            )
-            return
+        finally:
+            # bulk_create и bulk_update не отправляют сигналы.
+            bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            'Загрузка ингредиентов завершена. '
+            'Добавлено: {inserted}, обновлено: {updated}, '
+            'пропущено: {skipped}.'.format(**self.stats)
+        ))
 
-        ingredients_to_create = []
-        for item in data:
-            name = item.get('name')
-            measurement_unit = item.get('measurement_unit')
-            if name and measurement_unit:
-                ingredients_to_create.append(
-                    Ingredient(
-                        name=str(name).strip(),
-                        measurement_unit=measurement_unit
-                    )
-                )
-        if not ingredients_to_create:
-            self.stdout.write(
-                self.style.WARNING(
-                    'Нет валидных ингредиентов '
-                    'для добавления после обработки JSON.'))
-            return
-        try:
-            Ingredient.objects.bulk_create(
-                ingredients_to_create,
-                ignore_conflicts=True
-            )
-            self.stdout.write(
-                self.style.SUCCESS('Загрузка ингредиентов успешно завершена.')
-            )
-        except Exception as e:
-            self.stderr.write(
-                self.style.ERROR('Произошла непредвиденная ошибка при '
-                                 f'сохранении ингредиентов:: {e}'))
+    @staticmethod
+    def detect_format(path):
+        extension = os.path.splitext(path)[1].lower().lstrip('.')
+        if extension in READERS:
+            return extension
+        if extension == 'ndjson':
+            return 'jsonl'
+        raise CommandError(
+            f'Не удалось определить формат файла {path}, укажите --format.'
+        )
+
+    @staticmethod
+    def clean(record):
+        """Возвращает пару (название, единица) или None для битых записей."""
+        if not isinstance(record, dict):
+            return None
+        name = str(record.get('name') or '').strip()
+        measurement_unit = str(record.get('measurement_unit') or '').strip()
+        if not name or not measurement_unit:
+            return None
+        return name, measurement_unit
+
+    @transaction.atomic
+    def save_batch(self, records):
+        """Сохраняет пакет записей: добавление, обновление или пропуск."""
+        pairs = {}
+        for record in records:
+            pair = self.clean(record)
+            if pair is None or pair in pairs:
+                self.stats['skipped'] += 1
+                continue
+            pairs[pair] = None
+        units = {}
+        for name, measurement_unit in pairs:
+            units.setdefault(name, set()).add(measurement_unit)
+        existing = {}
+        for ingredient in Ingredient.objects.filter(name__in=units):
+            existing.setdefault(ingredient.name, []).append(ingredient)
+        to_create = []
+        to_update = []
+        updated_names = set()
+        for name, measurement_unit in pairs:
+            same_name = existing.get(name, [])
+            if any(
+                ingredient.measurement_unit == measurement_unit
+                for ingredient in same_name
+            ):
+                self.stats['skipped'] += 1
+            elif self.update_units and len(same_name) == 1:
+                # Единицу обновляет первая запись пакета с этим названием,
+                # остальные пропускаются, чтобы не перезаписывать её. Если
+                # в пакете есть и текущая единица, ингредиент не меняется.
+                if (
+                    name in updated_names
+                    or same_name[0].measurement_unit in units[name]
+                ):
+                    self.stats['skipped'] += 1
+                    continue
+                updated_names.add(name)
+                to_update.append(Ingredient(
+                    pk=same_name[0].pk,
+                    name=name,
+                    measurement_unit=measurement_unit
+                ))
+            else:
+                to_create.append(Ingredient(
+                    name=name,
+                    measurement_unit=measurement_unit
+                ))
+        Ingredient.objects.bulk_update(to_update, ['measurement_unit'])
+        Ingredient.objects.bulk_create(to_create, ignore_conflicts=True)
+        # ignore_conflicts молча пропускает уже добавленные параллельно
+        # строки, поэтому добавленные считаются по числу строк в базе.
+        inserted = Ingredient.objects.filter(name__in=units).count() - sum(
+            map(len, existing.values())
+        )
+        self.stats['updated'] += len(to_update)
+        self.stats['inserted'] += inserted
+        self.stats['skipped'] += len(to_create) - inserted
@@ -0,0 +1,245 @@
+import json
+import uuid
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from api.ingredient_search import bump_version
+from foodgram.models import Ingredient, Recipe, RecipeIngredient, Tag, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт рецептов из файла JSON Lines, созданного командой '
+        'export_recipes. Рецепты получают новые ID, авторы сопоставляются '
+        'по email.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSON Lines с рецептами.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество рецептов в одной транзакции.'
+        )
+        parser.add_argument(
+            '--default-author',
+            help='Email автора для рецептов, автор которых не найден.'
+        )
+        parser.add_argument(
+            '--id-map',
+            help='Файл, в который записываются пары "старый_id новый_id".'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        self.default_author_id = None
+        if options['default_author']:
+            try:
+                self.default_author_id = User.objects.get(
+                    email=options['default_author']
+                ).pk
+            except User.DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["default_author"]} не найден.'
+                )
+        self.tags = dict(Tag.objects.values_list('slug', 'pk'))
+        self.stats = {'imported': 0, 'skipped': 0}
+        id_map = open(options['id_map'], 'w') if options['id_map'] else None
+        try:
+            with open(options['path'], 'r', encoding='utf-8') as f:
+                lines = (line for line in f if line.strip())
+                while True:
+                    batch = [
+                        json.loads(line)
+                        for line in islice(lines, batch_size)
+                    ]
+                    if not batch:
+                        break
+                    for old_id, new_id in self.save_batch(batch):
+                        if id_map:
+                            id_map.write(f'{old_id} {new_id}\n')
+                    self.stdout.write(
+                        f'Импортировано рецептов: {self.stats["imported"]}'
+                    )
+        except FileNotFoundError:
+            raise CommandError(f'Файл {options["path"]} не найден.')
+        except json.JSONDecodeError as e:
+            raise CommandError(f'Ошибка в процессе декодирования JSON: {e}')
+        finally:
+            if id_map:
+                id_map.close()
+            # Новые ингредиенты добавлены bulk_create без сигналов.
+            bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            'Импорт рецептов завершён. Импортировано: {imported}, '
+            'пропущено: {skipped}.'.format(**self.stats)
+        ))
+
+    def resolve_authors(self, records):
+        emails = {record['author']['email'] for record in records}
+        return dict(
+            User.objects.filter(email__in=emails).values_list('email', 'pk')
+        )
+
+    def resolve_tags(self, records):
+        """Сопоставляет теги файла с базой по slug, затем по названию.
+
+        Название тега тоже уникально: тег с тем же названием, но другим
+        slug считается тем же тегом и не создаётся заново.
+        """
+        missing = {
+            tag['slug']: tag
+            for record in records
+            for tag in record['tags']
+            if tag['slug'] not in self.tags
+        }
+        if not missing:
+            return
+
+        def fetch():
+            by_name = {}
+            for pk, slug, name in Tag.objects.filter(
+                Q(slug__in=missing)
+                | Q(name__in=[tag['name'] for tag in missing.values()])
+            ).values_list('pk', 'slug', 'name'):
+                self.tags[slug] = pk
+                by_name[name] = pk
+            for slug, tag in missing.items():
+                if slug not in self.tags and tag['name'] in by_name:
+                    self.tags[slug] = by_name[tag['name']]
+
+        fetch()
+        new_tags = [
+            Tag(**tag) for slug, tag in missing.items()
+            if slug not in self.tags
+        ]
+        if new_tags:
+            Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+            fetch()
+
+    def resolve_ingredients(self, records):
+        pairs = {
+            (item['name'], item['measurement_unit'])
+            for record in records
+            for item in record['ingredients']
+        }
+        names = {name for name, _ in pairs}
+
+        def fetch():
+            return {
+                (name, unit): pk
+                for pk, name, unit in Ingredient.objects.filter(
+                    name__in=names
+                ).values_list('pk', 'name', 'measurement_unit')
+            }
+
+        ingredients = fetch()
+        missing = pairs - ingredients.keys()
+        if missing:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in missing
+                ],
+                ignore_conflicts=True
+            )
+            ingredients = fetch()
+        return ingredients
+
+    def free_short_links(self, records):
+        """Короткие ссылки из файла, ещё не занятые в базе."""
+        links = {
+            record['short_link']
+            for record in records
+            if record.get('short_link')
+        }
+        return links - set(
+            Recipe.objects.filter(
+                short_link__in=links
+            ).values_list('short_link', flat=True)
+        )
+
+    @transaction.atomic
+    def save_batch(self, records):
+        """Сохраняет пакет рецептов и возвращает пары (старый ID, новый)."""
+        authors = self.resolve_authors(records)
+        self.resolve_tags(records)
+        ingredients = self.resolve_ingredients(records)
+        free_links = self.free_short_links(records)
+        recipes = []
+        imported = []
+        for record in records:
+            author_id = authors.get(
+                record['author']['email'], self.default_author_id
+            )
+            if author_id is None:
+                self.stats['skipped'] += 1
+                self.stderr.write(
+                    f'Рецепт {record["id"]} пропущен: автор '
+                    f'{record["author"]["email"]} не найден.'
+                )
+                continue
+            unknown_tags = [
+                tag['slug'] for tag in record['tags']
+                if tag['slug'] not in self.tags
+            ]
+            if unknown_tags:
+                self.stats['skipped'] += 1
+                self.stderr.write(
+                    f'Рецепт {record["id"]} пропущен: теги '
+                    f'{", ".join(unknown_tags)} конфликтуют с '
+                    f'существующими.'
+                )
+                continue
+            short_link = record.get('short_link')
+            if short_link in free_links:
+                free_links.discard(short_link)
+            else:
+                short_link = uuid.uuid4().hex
+            recipes.append(Recipe(
+                author_id=author_id,
+                name=record['name'],
+                text=record['text'],
+                image=record.get('image') or None,
+                cooking_time=record['cooking_time'],
+                short_link=short_link,
+            ))
+            imported.append(record)
+        Recipe.objects.bulk_create(recipes)
+        recipe_ingredients = []
+        recipe_tags = []
+        for recipe, record in zip(recipes, imported):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredients[
+                        (item['name'], item['measurement_unit'])
+                    ],
+                    amount=item['amount'],
+                )
+                for item in record['ingredients']
+            )
+            recipe_tags.extend(
+                Recipe.tags.through(
+                    recipe_id=recipe.pk,
+                    tag_id=self.tags[tag['slug']]
+                )
+                for tag in record['tags']
+            )
+        # auto_now_add перезаписывает дату при вставке, восстанавливаем её.
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        self.stats['imported'] += len(recipes)
+        return [
+            (record['id'], recipe.pk)
+            for recipe, record in zip(recipes, imported)
+        ]
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.models import User
+from foodgram_backend.profiling import PROFILE_HEADER, sign_profile_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт сотруднику значение заголовка X-Profile, с которым его '
+        'запросы профилируются (при PROFILING_ENABLED=True).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email сотрудника.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Сотрудник {options["email"]} не найден.'
+            )
+        self.stdout.write(f'{PROFILE_HEADER}: {sign_profile_token(user)}')
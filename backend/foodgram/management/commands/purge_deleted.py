@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет пользователей и рецепты, помеченные '
+        'удалёнными, вместе со связанными записями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.PURGE_BATCH_SIZE,
+            help='Количество строк в одном запросе DELETE.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        deleted = purge_deleted(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Очистка завершена. Удалено пользователей: {users}, '
+            'рецептов: {recipes}.'.format(**deleted)
+        ))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.pdf import purge_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы PDF списков покупок, которые не запрашивали '
+        'дольше заданного числа дней. Запускается по расписанию (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SHOPPING_LIST_TTL_DAYS,
+            help='Удалять файлы, не запрашивавшиеся столько дней.'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days не может быть отрицательным.')
+        removed = purge_shopping_lists(options['days'])['removed']
+        self.stdout.write(self.style.SUCCESS(
+            f'Очистка списков покупок завершена. Удалено файлов: {removed}.'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from foodgram import feed
+from foodgram.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново заполняет ленты подписок последними рецептами авторов, '
+        'например после импорта рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Предварительно очистить все ленты.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            FeedEntry.objects.all().delete()
+        follows = Follow.objects.select_related(
+            'user', 'following'
+        ).order_by('pk')
+        processed = 0
+        for follow in follows.iterator(chunk_size=1000):
+            feed.add_author(follow.user, follow.following)
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано подписок: {processed}.')
+        )
@@ -0,0 +1,98 @@
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from foodgram.jobs import requeue_stale, work
+
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры фоновых задач: --processes процессов по '
+        '--threads потоков в каждом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOB_WORKERS,
+            help='Количество потоков в процессе.'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Количество процессов.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, секунд.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить задачи из очереди и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['processes'] < 1:
+            raise CommandError(
+                '--threads и --processes должны быть положительными.'
+            )
+        worker_args = (
+            options['threads'], options['poll_interval'], options['once']
+        )
+        self.stdout.write(
+            'Воркеры запущены: процессов {processes}, потоков {threads}.'
+            .format(**options)
+        )
+        if options['processes'] == 1:
+            self.run_threads(*worker_args)
+            return
+        # Дочерние процессы не должны наследовать открытые соединения.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self.run_threads, args=worker_args)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def terminate(signum, frame):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, terminate)
+        for process in processes:
+            process.join()
+
+    @staticmethod
+    def run_threads(threads, poll_interval, once):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda signum, frame: stop.set())
+        workers = [
+            threading.Thread(target=work, args=(stop, poll_interval, once))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        checked_at = None
+        while any(worker.is_alive() for worker in workers):
+            if (
+                checked_at is None
+                or time.monotonic() - checked_at > STALE_CHECK_INTERVAL
+            ):
+                requeue_stale()
+                checked_at = time.monotonic()
+            stop.wait(poll_interval)
+        connections.close_all()
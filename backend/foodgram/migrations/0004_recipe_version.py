@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0003_user_followers_count_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия рецепта'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.21 on 2026-10-19 08:16
+
+from django.db import migrations, models
+import django.db.models.functions.text
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    Favorite = apps.get_model('foodgram', 'Favorite')
+    Recipe.objects.update(favorites_count=Coalesce(
+        Subquery(
+            Favorite.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0004_recipe_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='user_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('username'), name='user_username_upper_idx'),
+        ),
+    ]
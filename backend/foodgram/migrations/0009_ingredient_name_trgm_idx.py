@@ -0,0 +1,36 @@
+# Generated by Django 4.2.21 on 2026-10-19 08:41
+
+from django.db import migrations
+
+# Индекс нечёткого поиска ингредиентов (api/ingredient_search.py) есть
+# только на PostgreSQL, поэтому он не описан в модели и не попадает в
+# состояние миграций: иначе пересоздание таблицы в SQLite пыталось бы
+# создать и его.
+CREATE_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+    'ON foodgram_ingredient USING gin (name gin_trgm_ops)',
+]
+DROP_SQL = ['DROP INDEX IF EXISTS ingredient_name_trgm_idx']
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0008_user_recipe_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SQL),
+            run_on_postgresql(DROP_SQL),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.21 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_ingredient_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия данных',
+                'verbose_name_plural': 'Версии данных',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.21 on 2026-10-19 10:40
+
+from django.db import migrations
+
+# Поиск по префиксу в админке ('^username', '^name') строится как
+# UPPER(поле) LIKE UPPER('текст%'). На PostgreSQL с правилом сортировки,
+# отличным от C, такой LIKE использует только индекс с классом операторов
+# text_pattern_ops. Индексы есть только на PostgreSQL, поэтому, как и индекс
+# триграмм из 0009, они не описаны в моделях.
+CREATE_SQL = [
+    'CREATE INDEX IF NOT EXISTS user_username_upper_pattern_idx '
+    'ON foodgram_user (UPPER(username) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS recipe_name_upper_pattern_idx '
+    'ON foodgram_recipe (UPPER(name) text_pattern_ops)',
+]
+DROP_SQL = [
+    'DROP INDEX IF EXISTS user_username_upper_pattern_idx',
+    'DROP INDEX IF EXISTS recipe_name_upper_pattern_idx',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0010_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SQL),
+            run_on_postgresql(DROP_SQL),
+        ),
+    ]
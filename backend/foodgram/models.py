@@ -1,17 +1,47 @@
 import uuid
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 from .constants import (MAX_AMOUNT, MAX_EMAIL, MAX_INGREDIENTS,
                         MAX_MEASUREMENT_UNIT, MAX_RECIPE_NAME, MAX_TAG_NAME,
                         MAX_TAG_SLUG, MAX_TIME, MAX_USER, MIN_AMOUNT, MIN_TIME)
-from .queryset import RecipeQuerySet
+from .queryset import RecipeManager, RecipeQuerySet
 
 
-class User(AbstractUser):
+class ActiveUserManager(UserManager):
+    """Менеджер пользователей, скрывающий удалённых."""
+    use_in_migrations = False
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class UpdateSafeFieldsMixin:
+    """Не перезаписывает поля, изменяемые только через update().
+
+    Счётчики и отметка удаления меняются запросами с F() и update(), поэтому
+    значение в памяти может устареть: полное сохранение загруженного объекта
+    записывает все поля, кроме перечисленных в update_safe_fields. Явно
+    указанные update_fields сохраняются как есть.
+    """
+    update_safe_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = {*self.get_deferred_fields(), *self.update_safe_fields}
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(UpdateSafeFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True, max_length=MAX_EMAIL)
     username = models.CharField(
         max_length=MAX_USER,
@@ -29,6 +59,20 @@ class User(AbstractUser):
         null=True,
         default=None
     )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Дата удаления'
+    )
+    objects = ActiveUserManager()
+    all_objects = UserManager()
+    update_safe_fields = ('followers_count', 'deleted_at')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username']
 
@@ -36,6 +80,15 @@ class User(AbstractUser):
         ordering = ('username',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='user_deleted_at_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.username
@@ -87,7 +140,7 @@ class Ingredient(models.Model):
         return f'{self.name} {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(UpdateSafeFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -131,12 +184,37 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата добавления рецепта'
     )
-    objects = RecipeQuerySet.as_manager()
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия рецепта'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в избранное'
+    )
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Дата удаления'
+    )
+    objects = RecipeManager()
+    all_objects = RecipeQuerySet.as_manager()
+    update_safe_fields = ('favorites_count', 'deleted_at')
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='recipe_deleted_at_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Рецепт {self.name} от пользователя {self.author}'
@@ -144,7 +222,17 @@ class Recipe(models.Model):
     def save(self, *args, **kwargs):
         if not self.short_link:
             self.short_link = self.generate_short_link()
+        bump = not self._state.adding
+        if bump:
+            # Версию увеличивает база: сигналы тегов и ингредиентов
+            # поднимают её через F(), и значение в памяти может устареть.
+            self.version = models.F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
         super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
 
     def generate_short_link(self):
         recipe_hash = uuid.uuid4().hex[:3]
@@ -219,7 +307,7 @@ class Follow(models.Model):
         ]
 
     def __str__(self):
-        return self.following
+        return f'{self.user} подписан на {self.following}'
 
 
 class UserRecipeBase(models.Model):
@@ -236,6 +324,10 @@ class UserRecipeBase(models.Model):
         verbose_name='Рецепт',
         related_name='recipe_%(class)s'
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         abstract = True
@@ -246,6 +338,13 @@ class UserRecipeBase(models.Model):
                 name='%(app_label)s_%(class)s_user_recipe_unique'
             )
         ]
+        # Списки «моё избранное» и «моя корзина» по дате добавления.
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at'],
+                name='%(class)s_user_created_idx'
+            ),
+        ]
 
 
 class ShoppingCart(UserRecipeBase):
@@ -274,3 +373,129 @@ class Favorite(UserRecipeBase):
             f'Пользователь {self.user} добавил '
             f'в избранное рецепт {self.recipe}'
         )
+
+
+class FeedEntry(models.Model):
+    """Запись в ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class Job(models.Model):
+    """Фоновая задача, выполняемая командой run_workers."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.JSONField(default=dict, verbose_name='Аргументы')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Пользователь'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить не раньше'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата запуска'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата завершения'
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('-created_at',)
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='job_status_run_at_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.get_status_display()})'
+
+
+class DataVersion(models.Model):
+    """Версия данных, по которой процессы сбрасывают свои кэши в памяти."""
+    key = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='Ключ'
+    )
+    version = models.PositiveIntegerField(default=0, verbose_name='Версия')
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
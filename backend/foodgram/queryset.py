@@ -1,19 +1,37 @@
 from django.db import models
-from django.db.models import Exists, OuterRef, Value
+from django.db.models import Exists, F, OuterRef, Value
 
 
 class RecipeQuerySet(models.QuerySet):
+    def bump_version(self):
+        """Увеличивает версию рецептов, сбрасывая их кэш."""
+        return self.update(version=F('version') + 1)
+
+    def for_representation(self, fields=None):
+        """
+        Подгружает связанные данные только для полей рецепта из fields
+        (None — все поля) и откладывает загрузку ненужного описания.
+        """
+        queryset = self
+        if fields is None or 'author' in fields:
+            queryset = queryset.select_related('author')
+        if fields is None or 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if fields is None or 'ingredients' in fields:
+            queryset = queryset.prefetch_related(
+                'recipeingredient__ingredient'
+            )
+        if fields is not None and 'text' not in fields:
+            queryset = queryset.defer('text')
+        return queryset
+
     def with_user_annotations(self, user, FavoriteModel,
-                              ShoppingCartModel, RecipeModel):
+                              ShoppingCartModel, RecipeModel, fields=None):
         """
         Аннотирует queryset рецептов флагами is_favorite
         и is_in_shopping_cart для указанного пользователя.
         """
-        queryset = RecipeModel.objects.select_related(
-            'author').prefetch_related(
-            'tags',
-            'recipeingredient__ingredient'
-        )
+        queryset = RecipeModel.objects.for_representation(fields)
         if user.is_authenticated:
             queryset = queryset.annotate(is_favorited=Exists(
                 FavoriteModel.objects.filter(
@@ -32,3 +50,27 @@ class RecipeQuerySet(models.QuerySet):
                 is_in_shopping_cart=Value(False)
             )
         return queryset
+
+    def for_cached_representation(self, user, FollowModel):
+        """
+        Облегчённый queryset для страницы списка: только поля, нужные для
+        ключа кэша, и флаги пользователя, включая подписку на автора.
+        """
+        queryset = self.select_related(None).prefetch_related(None).only(
+            'id', 'version', 'author_id'
+        )
+        if user.is_authenticated:
+            return queryset.annotate(is_subscribed=Exists(
+                FollowModel.objects.filter(
+                    user=user,
+                    following=OuterRef('author')
+                )
+            ))
+        return queryset.annotate(is_subscribed=Value(False))
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+    """Менеджер рецептов, скрывающий удалённые."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
@@ -0,0 +1,90 @@
+"""Избранное, корзина и подписки: добавление и удаление одним запросом.
+
+add выполняет INSERT ... ON CONFLICT DO NOTHING (INSERT OR IGNORE в SQLite)
+вместо get_or_create: повторный или параллельный запрос не получает
+IntegrityError, а число изменённых строк показывает, была ли запись
+добавлена. remove удаляет записи одним DELETE без предварительного SELECT.
+Сигналы post_save и post_delete при этом не отправляются, поэтому
+счётчики и ленты обновляются здесь явно теми же функциями, что вызывают
+обработчики сигналов при изменениях через ORM и админку.
+"""
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Greatest
+from django.db.models.sql import InsertQuery
+
+from . import feed
+from .models import Favorite, Follow, Recipe, User
+
+
+def follow_added(follow):
+    User.objects.filter(pk=follow.following_id).update(
+        followers_count=F('followers_count') + 1
+    )
+    feed.add_author(follow.user, follow.following)
+
+
+def follow_removed(follow):
+    User.objects.filter(pk=follow.following_id).update(
+        followers_count=Greatest(F('followers_count') - 1, 0)
+    )
+    feed.remove_author(follow.user_id, follow.following_id)
+
+
+def favorite_added(favorite):
+    Recipe.objects.filter(pk=favorite.recipe_id).update(
+        favorites_count=F('favorites_count') + 1
+    )
+
+
+def favorite_removed(favorite):
+    Recipe.objects.filter(pk=favorite.recipe_id).update(
+        favorites_count=Greatest(F('favorites_count') - 1, 0)
+    )
+
+
+ON_ADD = {Follow: follow_added, Favorite: favorite_added}
+ON_REMOVE = {Follow: follow_removed, Favorite: favorite_removed}
+
+
+def insert_ignore(instance, using):
+    """Вставляет строку, пропуская конфликт уникальности."""
+    opts = instance._meta
+    query = InsertQuery(type(instance), on_conflict=OnConflict.IGNORE)
+    query.insert_values(
+        [field for field in opts.local_concrete_fields if field != opts.pk],
+        [instance]
+    )
+    with connections[using].cursor() as cursor:
+        for sql, params in query.get_compiler(using=using).as_sql():
+            cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+
+def add(model, **fields):
+    """Добавляет запись, если её нет. True, если запись добавлена."""
+    instance = model(**fields)
+    using = router.db_for_write(model)
+    hook = ON_ADD.get(model)
+    if hook is None:
+        return insert_ignore(instance, using)
+    with transaction.atomic(using=using):
+        added = insert_ignore(instance, using)
+        if added:
+            hook(instance)
+    return added
+
+
+def remove(model, **fields):
+    """Удаляет запись одним DELETE. True, если запись была."""
+    queryset = model.objects.filter(**fields)
+    using = router.db_for_write(model)
+    hook = ON_REMOVE.get(model)
+    if hook is None:
+        return queryset._raw_delete(using) > 0
+    with transaction.atomic(using=using):
+        removed = queryset._raw_delete(using) > 0
+        if removed:
+            hook(model(**fields))
+    return removed
@@ -0,0 +1,67 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import feed, relations
+from .jobs import enqueue
+from .models import Favorite, Follow, Ingredient, Recipe, Tag, User
+
+
+@receiver(post_save, sender=Recipe)
+def publish_recipe(sender, instance, created, **kwargs):
+    """Раскладывает новый рецепт по лентам подписчиков."""
+    if created:
+        enqueue(feed.fan_out_recipe, recipe_id=instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        relations.follow_added(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    relations.follow_removed(instance)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        relations.favorite_added(instance)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    relations.favorite_removed(instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сбрасывает кэш рецептов при изменении их тегов."""
+    if reverse and action == 'pre_clear':
+        Recipe.objects.filter(tags=instance).bump_version()
+    elif action in ('post_add', 'post_remove'):
+        recipe_ids = pk_set if reverse else {instance.pk}
+        Recipe.objects.filter(pk__in=recipe_ids).bump_version()
+    elif action == 'post_clear' and not reverse:
+        Recipe.objects.filter(pk=instance.pk).bump_version()
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).bump_version()
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).bump_version()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Сбрасывает кэш рецептов автора при изменении его профиля."""
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    Recipe.objects.filter(author=instance).bump_version()
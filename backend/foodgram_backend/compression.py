@@ -0,0 +1,111 @@
+"""Сжатие ответов в brotli или gzip по заголовку Accept-Encoding."""
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
+ACCEPT_ENCODING_RE = re.compile(
+    r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*'
+)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых (q=0)."""
+    encodings = set()
+    for part in header.split(','):
+        match = ACCEPT_ENCODING_RE.fullmatch(part)
+        if not match:
+            continue
+        encoding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(encoding.lower())
+    return encodings
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает текстовые ответы размером от COMPRESSION_MIN_SIZE байт,
+    выбирая brotli (если установлен и поддерживается клиентом) или gzip.
+    Потоковые ответы сжимаются по частям.
+    """
+
+    def choose_encoding(self, request):
+        encodings = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if brotli is not None and 'br' in encodings:
+            return 'br'
+        if 'gzip' in encodings:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = brotli_sequence(
+                    response.streaming_content
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content
+                )
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(
+                    response.content, quality=settings.BROTLI_QUALITY
+                )
+            else:
+                compressed = gzip.compress(
+                    response.content, compresslevel=settings.GZIP_LEVEL
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
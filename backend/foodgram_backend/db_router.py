@@ -0,0 +1,121 @@
+"""Маршрутизация запросов к базе между основной базой и репликами.
+
+GET-запросы к API читают данные с реплики, выбранной на весь запрос.
+После первой записи в рамках запроса все чтения идут в основную базу,
+а клиент на REPLICA_STICKY_SECONDS секунд закрепляется за основной базой,
+чтобы видеть свои изменения, пока реплика их догоняет.
+"""
+import contextvars
+import hashlib
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = contextvars.ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return [
+        alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS
+    ]
+
+
+class ReplicaRouter:
+    """Роутер: чтение с реплики в GET-запросах, всё остальное — в основную."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state is None
+            or state.replica is None
+            or state.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = set(settings.DATABASES)
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Выбирает базу для чтения на время обработки запроса."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replicas = replica_aliases()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sticky_key(request):
+        auth = request.headers.get('Authorization')
+        if not auth:
+            return None
+        digest = hashlib.sha256(auth.encode()).hexdigest()
+        return f'db-primary-sticky:{digest}'
+
+    def wants_replica(self, request):
+        return bool(
+            self.replicas
+            and request.method in SAFE_METHODS
+            and request.path.startswith('/api/')
+        )
+
+    def start(self, use_replica):
+        replica = random.choice(self.replicas) if use_replica else None
+        return _routing.set(RoutingState(replica))
+
+    def finish(self, token):
+        """Возвращает True, если клиента нужно закрепить за основной базой."""
+        state = _routing.get()
+        _routing.reset(token)
+        return state.wrote and settings.REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = self.sticky_key(request)
+        use_replica = self.wants_replica(request) and not (
+            key and cache.get(key)
+        )
+        token = self.start(use_replica)
+        try:
+            return self.get_response(request)
+        finally:
+            if self.finish(token) and key:
+                cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
+
+    async def __acall__(self, request):
+        key = self.sticky_key(request)
+        use_replica = self.wants_replica(request) and not (
+            key and await cache.aget(key)
+        )
+        token = self.start(use_replica)
+        try:
+            return await self.get_response(request)
+        finally:
+            if self.finish(token) and key:
+                await cache.aset(key, True, settings.REPLICA_STICKY_SECONDS)
@@ -0,0 +1,256 @@
+"""Метрики запросов в формате Prometheus.
+
+MetricsMiddleware измеряет длительность запросов и время SQL-запросов
+(через execute_wrapper) по представлениям: меткой view служит имя URL
+без пространства имён, например recipes-list или
+recipes-download_shopping_cart. Каждый процесс копит метрики в памяти и
+не чаще раза в METRICS_FLUSH_INTERVAL секунд сбрасывает их в файл
+<pid>.json в общем каталоге METRICS_DIR. Представление metrics_view
+складывает файлы всех воркеров и отдаёт результат в текстовом формате
+Prometheus.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HISTOGRAMS = {
+    'foodgram_request_duration_seconds': 'Длительность обработки запроса.',
+    'foodgram_request_db_seconds': 'Время SQL-запросов за один запрос.',
+    'foodgram_render_duration_seconds': 'Время рендеринга ответа API.',
+    'foodgram_pdf_render_seconds': 'Время отрисовки списка покупок.',
+}
+COUNTERS = {
+    'foodgram_requests_total': 'Количество запросов.',
+    'foodgram_db_queries_total': 'Количество SQL-запросов.',
+}
+
+
+class Registry:
+    """Метрики процесса: гистограммы и счётчики по наборам меток."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(
+            lambda: {'buckets': [0] * len(BUCKETS), 'sum': 0, 'count': 0}
+        )
+        self.counters = defaultdict(int)
+        self.flushed_at = 0
+
+    @staticmethod
+    def key(name, labels):
+        return json.dumps([name, sorted(labels.items())])
+
+    def observe(self, name, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        with self.lock:
+            histogram = self.histograms[self.key(name, labels)]
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+        self.maybe_flush()
+
+    def inc(self, name, value=1, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        with self.lock:
+            self.counters[self.key(name, labels)] += value
+
+    def maybe_flush(self):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if time.monotonic() - self.flushed_at >= interval:
+            self.flush()
+
+    def flush(self):
+        """Атомарно записывает метрики процесса в METRICS_DIR/<pid>.json."""
+        with self.lock:
+            data = json.dumps({
+                'histograms': self.histograms,
+                'counters': self.counters,
+            })
+            self.flushed_at = time.monotonic()
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, os.path.join(directory, f'{os.getpid()}.json'))
+
+
+registry = Registry()
+observe = registry.observe
+inc = registry.inc
+
+
+@atexit.register
+def flush_on_exit():
+    if settings.METRICS_ENABLED and registry.flushed_at:
+        registry.flush()
+
+
+def collect():
+    """Складывает метрики всех процессов из METRICS_DIR."""
+    registry.flush()
+    histograms = defaultdict(
+        lambda: {'buckets': [0] * len(BUCKETS), 'sum': 0, 'count': 0}
+    )
+    counters = defaultdict(int)
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for key, histogram in data['histograms'].items():
+            total = histograms[key]
+            total['buckets'] = [
+                a + b for a, b in zip(total['buckets'], histogram['buckets'])
+            ]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+        for key, value in data['counters'].items():
+            counters[key] += value
+    return histograms, counters
+
+
+def format_labels(labels, **extra):
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in labels
+    )
+
+
+def render():
+    """Метрики в текстовом формате Prometheus."""
+    histograms, counters = collect()
+    grouped = defaultdict(list)
+    for key, value in list(histograms.items()) + list(counters.items()):
+        name, labels = json.loads(key)
+        grouped[name].append((labels, value))
+    lines = []
+    for name, help_text in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, histogram in sorted(grouped[name]):
+            for bound, count in zip(BUCKETS, histogram['buckets']):
+                lines.append(
+                    f'{name}_bucket{format_labels(labels, le=bound)} {count}'
+                )
+            lines += [
+                f'{name}_bucket{format_labels(labels, le="+Inf")} '
+                f'{histogram["count"]}',
+                f'{name}_sum{format_labels(labels)} {histogram["sum"]}',
+                f'{name}_count{format_labels(labels)} {histogram["count"]}',
+            ]
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for labels, value in sorted(grouped[name]):
+            lines.append(f'{name}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unmatched'
+    return match.url_name
+
+
+class QueryStats:
+    """Обёртка execute_wrapper: количество и время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Записывает длительность запросов и статистику SQL по представлениям.
+
+    В асинхронном режиме ORM работает в других потоках, поэтому для
+    асинхронных представлений измеряется только длительность запроса.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def record(request, response, elapsed, queries=None):
+        labels = {'view': view_label(request), 'method': request.method}
+        inc(
+            'foodgram_requests_total',
+            status=response.status_code,
+            **labels
+        )
+        if queries is not None:
+            inc('foodgram_db_queries_total', queries.count, **labels)
+            observe('foodgram_request_db_seconds', queries.time, **labels)
+        observe('foodgram_request_duration_seconds', elapsed, **labels)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+
+def metrics_view(request):
+    """Метрики для Prometheus: по токену METRICS_TOKEN или для сотрудников."""
+    token = settings.METRICS_TOKEN
+    authorized = (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    ) or (request.user.is_authenticated and request.user.is_staff)
+    if not authorized:
+        return HttpResponseForbidden()
+    if not settings.METRICS_ENABLED:
+        return HttpResponse(status=404)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,147 @@
+"""Профилирование отдельных запросов в продакшене.
+
+При PROFILING_ENABLED=True запрос профилируется cProfile, если он попал в
+выборку PROFILING_SAMPLE_RATE или пришёл с заголовком X-Profile, подписанным
+для сотрудника командой profile_token. Профиль (.prof, открывается
+pstats или snakeviz) и список SQL-запросов (.json) сохраняются в
+PROFILING_DIR, где хранится не больше PROFILING_KEEP последних профилей.
+Когда профилирование выключено, middleware исключается из цепочки.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+SIGNING_SALT = 'foodgram.profiling'
+
+
+def sign_profile_token(user):
+    """Значение заголовка X-Profile для сотрудника."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(str(user.pk))
+
+
+def staff_token_valid(token):
+    try:
+        user_id = signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return get_user_model().objects.filter(
+        pk=user_id, is_staff=True
+    ).exists()
+
+
+class QueryLog:
+    """Обёртка execute_wrapper, записывающая SQL-запросы и их время."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': context['connection'].alias,
+                'sql': sql,
+                'params': repr(params),
+                'many': many,
+                'time': time.perf_counter() - start,
+            })
+
+
+class ProfilingMiddleware:
+    """Профилирует выбранные запросы и сохраняет результаты на диск."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = settings.PROFILING_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def wants_profile(self, request):
+        token = request.headers.get(PROFILE_HEADER)
+        if token:
+            return staff_token_valid(token)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.wants_profile(request):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        query_log = QueryLog()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_log))
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+        elapsed = time.perf_counter() - started
+        name = self.save(request, response, profile, query_log, elapsed)
+        response['X-Profile-Id'] = name
+        return response
+
+    def save(self, request, response, profile, query_log, elapsed):
+        path_slug = re.sub(r'[^\w-]+', '_', request.path).strip('_')[:60]
+        name = '{}-{}-{}-{}'.format(
+            time.strftime('%Y%m%d-%H%M%S'),
+            request.method,
+            path_slug or 'root',
+            uuid.uuid4().hex[:8]
+        )
+        base = os.path.join(self.directory, name)
+        try:
+            profile.dump_stats(base + '.prof')
+            with open(base + '.json', 'w', encoding='utf-8') as f:
+                json.dump({
+                    'method': request.method,
+                    'path': request.get_full_path(),
+                    'status': response.status_code,
+                    'time': elapsed,
+                    'query_count': len(query_log.queries),
+                    'query_time': sum(
+                        query['time'] for query in query_log.queries
+                    ),
+                    'queries': query_log.queries,
+                }, f, ensure_ascii=False, indent=2)
+            self.rotate()
+        except OSError:
+            logger.exception('Не удалось сохранить профиль запроса.')
+        return name
+
+    def rotate(self):
+        """Удаляет самые старые профили сверх PROFILING_KEEP."""
+        profiles = sorted(
+            (
+                entry for entry in os.scandir(self.directory)
+                if entry.name.endswith('.prof')
+            ),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in profiles[:-settings.PROFILING_KEEP or None]:
+            base = entry.path[:-len('.prof')]
+            for path in (base + '.prof', base + '.json'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
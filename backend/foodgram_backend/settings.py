@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from django.core.management.utils import get_random_secret_key
@@ -31,7 +32,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram_backend.profiling.ProfilingMiddleware',
+    'foodgram_backend.slow_queries.QuerySourceMiddleware',
+    'foodgram_backend.compression.CompressionMiddleware',
+    'foodgram_backend.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +66,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
+ASGI_APPLICATION = 'foodgram_backend.asgi.application'
+
+# Режим запуска сервера: wsgi (синхронные воркеры gunicorn) или asgi
+# (воркеры uvicorn). В режиме asgi запросы к рецептам, тегам и ингредиентам
+# принимают асинхронные представления из api/async_views.py.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+ASYNC_API = os.getenv('ASYNC_API', str(SERVER_MODE == 'asgi')) == 'True'
 
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
@@ -80,16 +93,85 @@ if DATABASE_CHOICE == 'postgres':
         }
     }
 elif DATABASE_CHOICE == 'sqlite':
+    # Бэкенд foodgram_backend.sqlite выполняет PRAGMA при подключении и
+    # начинает транзакции с BEGIN IMMEDIATE. busy_timeout — сколько
+    # миллисекунд ждать блокировку записи, cache_size с минусом — размер
+    # кэша страниц в КиБ.
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': 'foodgram_backend.sqlite',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Тестовая база в файле: тесты с потоками пишут в неё через
+            # отдельные соединения, а общая база в памяти блокирует таблицы
+            # без ожидания busy_timeout.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+            'OPTIONS': {
+                'pragmas': {
+                    'journal_mode': 'WAL',
+                    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+                    'busy_timeout': int(
+                        os.getenv('SQLITE_BUSY_TIMEOUT', 5000)
+                    ),
+                    'mmap_size': int(
+                        os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+                    ),
+                    'cache_size': int(
+                        os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)
+                    ),
+                    'temp_store': 'MEMORY',
+                },
+                'transaction_mode': os.getenv(
+                    'SQLITE_TRANSACTION_MODE', 'IMMEDIATE'
+                ),
+            },
         }
     }
 else:
     raise ValueError(f"Неизвестное значение для DATABASE_CHOICE: {DATABASE_CHOICE}. "
                      "Допустимые значения: 'postgres', 'sqlite'.")
 
+# Триграммный поиск ингредиентов (pg_trgm) на PostgreSQL.
+if DATABASE_CHOICE == 'postgres':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Реплики для чтения через запятую: для PostgreSQL — хосты (host[:port]),
+# для SQLite — пути к файлам относительно BASE_DIR.
+DATABASE_REPLICAS = [
+    replica.strip()
+    for replica in os.getenv('DATABASE_REPLICAS', '').split(',')
+    if replica.strip()
+]
+for number, replica in enumerate(DATABASE_REPLICAS, start=1):
+    replica_config = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DATABASE_CHOICE == 'postgres':
+        host, _, port = replica.partition(':')
+        replica_config.update(HOST=host, PORT=port or replica_config['PORT'])
+    else:
+        replica_config['NAME'] = BASE_DIR / replica
+    DATABASES[f'replica{number}'] = replica_config
+
+DATABASE_ROUTERS = ['foodgram_backend.db_router.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кэш токенов аутентификации: алиас из CACHES и время жизни записи. Выход и
+# смена пароля сбрасывают запись только в этом кэше, поэтому при нескольких
+# воркерах gunicorn (WEB_CONCURRENCY) и кэше в памяти процесса кэширование
+# токенов отключается (api/authentication.py).
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+TOKEN_CACHE_ALIAS = os.getenv('TOKEN_CACHE_ALIAS', 'default')
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 60))
+
 AUTH_USER_MODEL = 'foodgram.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -121,15 +203,93 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'collected_static'
 MAX_PAGE_SIZE = 20
 PAGE_SIZE = 6
+# Начиная с этого количества строк пагинатор списков без фильтров берёт
+# оценку из статистики PostgreSQL вместо точного COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = int(
+    os.getenv('ESTIMATED_COUNT_THRESHOLD', 100000)
+)
+
+# Лента подписок: авторы с большим числом подписчиков не раскладываются
+# по лентам, их рецепты подмешиваются при чтении.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 10000))
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 100
+
+# Время жизни кэшированного представления рецепта, секунд.
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 3600))
+# Поиск ингредиентов с опечатками (api/ingredient_search.py): порог
+# похожести от 0 до 1 и число результатов нечёткого поиска.
+INGREDIENT_FUZZY_SEARCH = os.getenv(
+    'INGREDIENT_FUZZY_SEARCH', 'True'
+) == 'True'
+INGREDIENT_SIMILARITY_THRESHOLD = float(
+    os.getenv('INGREDIENT_SIMILARITY_THRESHOLD', 0.5)
+)
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+# Сжатие ответов: минимальный размер тела в байтах и уровни сжатия.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Размер порции при потоковой выдаче непагинированных списков.
+STREAM_CHUNK_SIZE = 500
+
+# Метрики Prometheus (foodgram_backend/metrics.py): общий для воркеров
+# каталог, интервал сброса метрик процесса в файл и токен доступа к
+# /metrics (без токена метрики доступны только сотрудникам).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_DIR = os.getenv(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'foodgram_metrics')
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Профилирование запросов (foodgram_backend/profiling.py): доля случайно
+# профилируемых запросов, каталог и число хранимых профилей, срок действия
+# заголовка X-Profile в секундах.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 200))
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# Удалённые пользователи и рецепты окончательно стираются в фоне
+# порциями этого размера.
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', 1000))
+
+# Фоновые задачи (foodgram/jobs.py): число потоков воркера, интервал
+# опроса очереди и задержка перед повтором в секундах, время, после
+# которого задача зависшего воркера возвращается в очередь.
+# JOBS_EAGER=True выполняет задачи сразу, без воркеров.
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', 600))
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Список покупок отрисовывается фоновой задачей, а запрос на скачивание
+# возвращает 202 и задачу, пока файл не готов. Готовые файлы отдаёт nginx
+# по заголовку X-Accel-Redirect.
+SHOPPING_LIST_ASYNC = os.getenv('SHOPPING_LIST_ASYNC', 'False') == 'True'
+# Файлы списков покупок, не запрашивавшиеся столько дней, удаляет команда
+# purge_shopping_lists.
+SHOPPING_LIST_TTL_DAYS = int(os.getenv('SHOPPING_LIST_TTL_DAYS', 7))
+USE_X_ACCEL_REDIRECT = os.getenv('USE_X_ACCEL_REDIRECT', 'False') == 'True'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -140,6 +300,29 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
     ),
+    # Лимиты считаются в единицах стоимости запросов (api/throttling.py).
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.UserCostThrottle',
+        'api.throttling.IPCostThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', '600/min'),
+        'ip': os.getenv('THROTTLE_IP_RATE', '1200/min'),
+    },
+    'THROTTLE_COSTS': {
+        'recipes.create': 10,
+        'recipes.update': 10,
+        'recipes.partial_update': 10,
+        'recipes.get_download_shopping_cart': 20,
+        'ingredients.list': 10,
+        'users.update_avatar': 10,
+    },
+    'HEAVY_REQUEST_COST': 10,
+    'MAX_CONCURRENT_HEAVY_REQUESTS': int(
+        os.getenv('MAX_CONCURRENT_HEAVY_REQUESTS', 2)
+    ),
+    # Число прокси перед бэкендом: IP клиента берётся из X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
 DJOSER = {
@@ -150,3 +333,34 @@ DJOSER = {
     'HIDE_USERS': 'False',
     'LOGIN_FIELD': 'email'
 }
+
+# Журнал медленных SQL-запросов (foodgram_backend/slow_queries.py):
+# запросы дольше SLOW_QUERY_MS миллисекунд пишутся в лог с нормализованным
+# SQL и, на PostgreSQL, планом EXPLAIN. 0 выключает журнал.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'default',
+        },
+    },
+    'loggers': {
+        'foodgram': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+        'foodgram_backend': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
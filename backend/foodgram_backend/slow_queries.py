@@ -0,0 +1,185 @@
+"""Журнал медленных SQL-запросов.
+
+Обёртка execute_wrapper ставится на каждое новое соединение с базой и
+пишет в лог foodgram_backend.slow_queries запросы дольше SLOW_QUERY_MS
+миллисекунд: время, источник (представление или фоновая задача) и
+нормализованный SQL, в котором числа и списки параметров заменены
+заглушками. На PostgreSQL для каждого нормализованного запроса один раз
+за жизнь процесса к записи добавляется план EXPLAIN (без ANALYZE).
+"""
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+MAX_EXPLAINED = 1000
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+VALUES_RE = re.compile(r'\bVALUES \(.*', re.DOTALL)
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+SPACE_RE = re.compile(r'\s+')
+EXPLAINABLE = ('SELECT', 'WITH')
+
+_source = contextvars.ContextVar('slow_query_source', default=None)
+_explaining = threading.local()
+_explained = set()
+_explained_lock = threading.Lock()
+
+
+def normalize(sql):
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    sql = VALUES_RE.sub('VALUES (...)', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+class QuerySource:
+    """Источник запросов. Имя можно задать позже: при ASGI обработчики
+    middleware работают в копиях контекста, и изменение самого объекта
+    видно из всех копий, в отличие от нового значения переменной."""
+
+    def __init__(self, name=None):
+        self.name = name
+
+
+@contextmanager
+def query_source(name=None):
+    """Помечает запросы внутри блока источником name."""
+    source = QuerySource(name)
+    token = _source.set(source)
+    try:
+        yield source
+    finally:
+        _source.reset(token)
+
+
+def source_name():
+    source = _source.get()
+    return source.name if source is not None and source.name else '-'
+
+
+def should_explain(connection, sql, fingerprint, many):
+    if (
+        connection.vendor != 'postgresql'
+        or many
+        or not sql.lstrip().upper().startswith(EXPLAINABLE)
+    ):
+        return False
+    with _explained_lock:
+        if fingerprint in _explained or len(_explained) >= MAX_EXPLAINED:
+            return False
+        _explained.add(fingerprint)
+    return True
+
+
+def explain(connection, sql, params):
+    """План запроса через отдельный курсор, не задевая транзакцию."""
+    _explaining.active = True
+    cursor = connection.connection.cursor()
+    savepoint = connection.in_atomic_block
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute('EXPLAIN (ANALYZE off) ' + sql, params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        except Exception as error:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return f'EXPLAIN не выполнен: {error}'
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return plan
+    finally:
+        cursor.close()
+        _explaining.active = False
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    # Порог проверяется при каждом запросе: его можно отключить через
+    # override_settings уже после подключения журнала к соединению.
+    if settings.SLOW_QUERY_MS <= 0 or getattr(_explaining, 'active', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    failed = True
+    try:
+        result = execute(sql, params, many, context)
+        failed = False
+        return result
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        if elapsed >= settings.SLOW_QUERY_MS:
+            log_query(context['connection'], sql, params, many, elapsed,
+                      failed)
+
+
+def log_query(connection, sql, params, many, elapsed, failed):
+    normalized = normalize(sql)
+    fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    message = 'Медленный запрос %.1f мс [%s] %s %s'
+    args = [elapsed, source_name(), fingerprint, normalized]
+    if failed:
+        # Запрос прерван (statement_timeout, ожидание блокировки и т. п.);
+        # транзакция могла перейти в ошибочное состояние, поэтому без
+        # EXPLAIN.
+        message = 'Медленный запрос с ошибкой %.1f мс [%s] %s %s'
+    elif should_explain(connection, sql, fingerprint, many):
+        message += '\n%s'
+        args.append(explain(connection, sql, params))
+    logger.warning(message, *args)
+
+
+def install(sender, connection, **kwargs):
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+def setup():
+    """Подключает журнал ко всем соединениям, если задан порог."""
+    if settings.SLOW_QUERY_MS > 0:
+        connection_created.connect(install, dispatch_uid='slow_queries')
+
+
+class QuerySourceMiddleware:
+    """Запоминает имя представления как источник запросов к базе.
+
+    Переменная контекста устанавливается и сбрасывается в одном вызове
+    middleware, а process_view только дописывает имя в её объект. Когда
+    журнал выключен, middleware исключается из цепочки.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with query_source():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with query_source():
+            return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        source = _source.get()
+        if source is not None:
+            match = request.resolver_match
+            source.name = (
+                match.view_name if match else view_func.__qualname__
+            )
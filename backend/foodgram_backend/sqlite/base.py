@@ -0,0 +1,40 @@
+"""Бэкенд SQLite для продакшена.
+
+Отличается от стандартного django.db.backends.sqlite3 двумя вещами:
+
+* при подключении выполняются PRAGMA из OPTIONS['pragmas'] (журнал WAL,
+  synchronous, busy_timeout, mmap_size, cache_size);
+* транзакции начинаются командой BEGIN IMMEDIATE (OPTIONS
+  ['transaction_mode']), то есть сразу берут блокировку записи. При
+  обычном BEGIN две транзакции, успевшие прочитать данные, не могут обе
+  перейти к записи, и одна из них сразу получает «database is locked»
+  без ожидания busy_timeout.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.transaction_mode = kwargs.pop(
+            'transaction_mode', 'IMMEDIATE'
+        ).upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(
+                f'Неизвестный режим транзакций SQLite: '
+                f'{self.transaction_mode}.'
+            )
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,35 @@
+"""Настройки gunicorn.
+
+Приложение загружается в мастер-процессе до запуска воркеров
+(preload_app), поэтому Django, DRF и модули проекта импортируются один
+раз, а воркеры получают их копией при fork. Число воркеров задаётся
+переменной WEB_CONCURRENCY, SERVER_MODE=asgi запускает воркеры uvicorn.
+"""
+import os
+import shutil
+
+bind = '0.0.0.0:9123'
+preload_app = True
+
+if os.getenv('SERVER_MODE') == 'asgi':
+    wsgi_app = 'foodgram_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram_backend.wsgi:application'
+
+
+def when_ready(server):
+    """Прогревает приложение в мастер-процессе перед запуском воркеров."""
+    from django.conf import settings
+    from django.db import connections
+    from django.urls import get_resolver
+
+    from api.pdf import register_font
+
+    # Импорт представлений, сериализаторов и фильтров через URLconf.
+    get_resolver().url_patterns
+    register_font()
+    # Метрики прошлого запуска относятся к завершённым процессам.
+    shutil.rmtree(settings.METRICS_DIR, ignore_errors=True)
+    # Соединения с базой не должны наследоваться воркерами.
+    connections.close_all()